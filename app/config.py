@@ -1,4 +1,3 @@
-
 """
 全局配置与公共变量
 """
@@ -8,40 +7,103 @@ from dotenv import load_dotenv
 # 加载 .env 文件
 load_dotenv()
 
-class Config:
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    """读取布尔型环境变量"""
+    return os.getenv(name, default).lower() == "true"
+
+
+# 依赖环境变量的配置项，首次访问时才读取并缓存
+_LAZY_SETTINGS = {
     # 音乐文件目录
-    MUSIC_DIR = os.getenv("MUSIC_DIR", r"C:\Users\Administrator\Downloads\song\test")
-    LYRICS_DIR = os.getenv("LYRICS_DIR", r"C:\Users\Administrator\Downloads\song\test\lyrics")
-    COVER_DIR = os.getenv("COVER_DIR", r"C:\Users\Administrator\Downloads\song\test\covers")
-    THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", r"C:\Users\Administrator\Downloads\song\test\thumbnails")
+    "MUSIC_DIR": lambda: os.getenv("MUSIC_DIR", r"C:\Users\Administrator\Downloads\song\test"),
+    "LYRICS_DIR": lambda: os.getenv("LYRICS_DIR", r"C:\Users\Administrator\Downloads\song\test\lyrics"),
+    "COVER_DIR": lambda: os.getenv("COVER_DIR", r"C:\Users\Administrator\Downloads\song\test\covers"),
+    "THUMBNAIL_DIR": lambda: os.getenv("THUMBNAIL_DIR", r"C:\Users\Administrator\Downloads\song\test\thumbnails"),
+    "LOCAL_MUSIC_DIR": lambda: [Config.MUSIC_DIR],
     
-    # 支持的文件格式
-    MUSIC_EXTS = [".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg", ".wma"]
-    LYRICS_EXTS = [".lrc", ".txt"]
-    COVER_EXTS = [".jpg", ".jpeg", ".png", ".webp", ".bmp"]
+    # 静态token
+    "STATIC_TOKEN": lambda: os.getenv("STATIC_TOKEN", "your_static_token_here"),
     
-    # 缩略图配置
-    THUMBNAIL_SIZE = (200, 200)  # 缩略图尺寸 (宽, 高)
-    THUMBNAIL_QUALITY = 85  # JPEG 压缩质量 (1-100)
+    # 数据库配置
+    "MYSQL_USER": lambda: os.getenv("MYSQL_USER", "root"),
+    "MYSQL_PASSWORD": lambda: os.getenv("MYSQL_PASSWORD", "123456"),
+    "MYSQL_HOST": lambda: os.getenv("MYSQL_HOST", "127.0.0.1"),
+    "MYSQL_PORT": lambda: os.getenv("MYSQL_PORT", "3306"),
+    "MYSQL_DB": lambda: os.getenv("MYSQL_DB", "music_db"),
+    # 驱动: auto（已安装 mysqlclient 时用 mysqldb，否则 pymysql）/ mysqldb / pymysql
+    "MYSQL_DRIVER": lambda: os.getenv("MYSQL_DRIVER", "auto").lower(),
     
-    LOCAL_MUSIC_DIR = [MUSIC_DIR]
+    # 连接池配置
+    "MYSQL_POOL_SIZE": lambda: int(os.getenv("MYSQL_POOL_SIZE", "10")),
+    "MYSQL_MAX_OVERFLOW": lambda: int(os.getenv("MYSQL_MAX_OVERFLOW", "20")),
+    "MYSQL_POOL_RECYCLE": lambda: int(os.getenv("MYSQL_POOL_RECYCLE", "1800")),  # 应小于 MySQL wait_timeout
+    "MYSQL_POOL_TIMEOUT": lambda: int(os.getenv("MYSQL_POOL_TIMEOUT", "20")),  # 等待空闲连接的最长秒数
+    "MYSQL_POOL_PRE_PING": lambda: _env_bool("MYSQL_POOL_PRE_PING", "true"),  # 取出连接前探测是否存活
     
-    # 静态token
-    STATIC_TOKEN = os.getenv("STATIC_TOKEN", "your_static_token_here")
+    # 服务器配置
+    "SERVER_HOST": lambda: os.getenv("SERVER_HOST", "0.0.0.0"),
+    "SERVER_PORT": lambda: int(os.getenv("SERVER_PORT", "8000")),
+    # 同步路由线程池大小，默认与数据库连接上限一致（连接池 + 溢出）
+    "THREADPOOL_SIZE": lambda: int(os.getenv("THREADPOOL_SIZE", "0")) or (
+        Config.MYSQL_POOL_SIZE + Config.MYSQL_MAX_OVERFLOW
+    ),
     
-    # 日志目录
-    LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
+    # 音频流每次读取的块大小（字节）
+    "STREAM_CHUNK_SIZE": lambda: int(os.getenv("STREAM_CHUNK_SIZE", str(256 * 1024))),
     
-    # 服务器配置
-    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
-    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    # 扫描导入文件夹时并行读取文件（MD5、标签、封面）的线程数
+    "SCAN_WORKERS": lambda: int(os.getenv("SCAN_WORKERS", "0")) or min(8, os.cpu_count() or 1),
+    # 不超过该大小（MB）的文件用 mmap 计算 MD5，更大的文件按块读取以限制内存占用，0 表示不使用 mmap
+    "MD5_MMAP_MAX_MB": lambda: int(os.getenv("MD5_MMAP_MAX_MB", "256")),
+    
+    # 文件下发交给 Nginx（X-Accel-Redirect）的内部路径前缀，留空则由应用自行读取文件
+    # 其下需配置 internal 的 music/、cover/、thumbnail/ 三个 location
+    "ACCEL_REDIRECT_PREFIX": lambda: os.getenv("ACCEL_REDIRECT_PREFIX", "").rstrip("/"),
     
     # CORS 配置
-    CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")  # 支持多个域名，用逗号分隔
+    "CORS_ORIGINS": lambda: os.getenv("CORS_ORIGINS", "*").split(","),  # 支持多个域名，用逗号分隔
     
     # 开发配置
-    RELOAD = os.getenv("RELOAD", "false").lower() == "true"  # 热重载开关
-    DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"  # 数据库 SQL 日志开关
+    "RELOAD": lambda: _env_bool("RELOAD"),  # 热重载开关
+    "DB_ECHO": lambda: _env_bool("DB_ECHO"),  # 数据库 SQL 日志开关
+}
+
+
+class _LazyConfigMeta(type):
+    """
+    延迟加载配置的元类
+    首次访问时计算配置值并写回类属性，之后的访问不再经过此处
+    """
+    
+    def __getattr__(cls, name):
+        factory = _LAZY_SETTINGS.get(name)
+        if factory is None:
+            raise AttributeError(f"Config has no attribute '{name}'")
+        value = factory()
+        setattr(cls, name, value)
+        return value
+
+
+class Config(metaclass=_LazyConfigMeta):
+    # 环境变量相关配置见 _LAZY_SETTINGS（按需读取）
+    
+    # 支持的文件格式（元组保留查找优先级）
+    MUSIC_EXTS = (".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg", ".wma")
+    LYRICS_EXTS = (".lrc", ".txt")
+    COVER_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+    
+    # 扩展名集合，用于 O(1) 成员判断
+    MUSIC_EXT_SET = frozenset(MUSIC_EXTS)
+    LYRICS_EXT_SET = frozenset(LYRICS_EXTS)
+    COVER_EXT_SET = frozenset(COVER_EXTS)
+    
+    # 缩略图配置
+    THUMBNAIL_SIZE = (200, 200)  # 缩略图尺寸 (宽, 高)
+    THUMBNAIL_QUALITY = 85  # JPEG 压缩质量 (1-100)
+    
+    # 日志目录
+    LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logs"))
     
     # 其他全局配置项...
 
@@ -5,14 +5,95 @@
 Provides in-memory task queue and shared data store functionality
 """
 
-import queue
+import heapq
 import threading
 import time
 import uuid
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
 from app.log import logger
 
 
+# 公共信息缺失标记（值本身可能为None）/ Sentinel for missing keys (values may be None)
+_MISSING = object()
+
+# 任务ID生成器，取 .hex 得到32位无连字符ID / Task ID factory; .hex gives a 32-char id
+_new_id = uuid.uuid4
+
+# 公共信息存储分片数(2的幂) / Number of public store shards (power of two)
+_STORE_SHARDS = 16
+
+
+class NormalTask:
+    """
+    普通任务 / Normal task
+    
+    定时任务触发时生成，在队列中等待时以 __slots__ 代替字典以减少内存；
+    pop_task 出队时转换为字典，Worker 拿到的始终是可修改的字典（可写入 retry_count 等字段后重新推入）
+    Created when a scheduled task fires. __slots__ instead of a dict saves memory while
+    queued; pop_task converts it to a dict, so workers always get a mutable dict
+    (e.g. setting retry_count and pushing it back works)
+    """
+    
+    __slots__ = ("task_id", "type", "params", "scheduler_task_id", "scheduler_task_name", "priority")
+    
+    def __init__(
+        self,
+        task_id: str,
+        type: str,
+        params: Optional[Dict[str, Any]] = None,
+        scheduler_task_id: Optional[str] = None,
+        scheduler_task_name: Optional[str] = None,
+        priority: int = 0
+    ):
+        self.task_id = task_id
+        self.type = type
+        self.params = params if params is not None else {}
+        self.scheduler_task_id = scheduler_task_id
+        self.scheduler_task_name = scheduler_task_name
+        self.priority = priority
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """按字段名读取，兼容字典任务 / Read field by name, dict-compatible"""
+        return getattr(self, key, default) if key in self.__slots__ else default
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典 / Convert to dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __repr__(self) -> str:
+        return f"NormalTask(task_id={self.task_id!r}, type={self.type!r})"
+
+
+class _StoreShard:
+    """
+    公共信息存储分片 / Public data store shard
+    
+    每个分片独立加锁，不相关的键不再争用同一把锁
+    Each shard has its own lock so unrelated keys do not contend
+    """
+    
+    __slots__ = ("values", "expires", "expiry_heap", "lock")
+    
+    def __init__(self):
+        # values: {key: value}，expires: {key: expire_at}（仅设置了TTL的键）
+        # values: {key: value}, expires: {key: expire_at} (only keys with TTL)
+        self.values: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        # 过期时间最小堆 (expire_at, key)，覆盖/删除的键惰性剔除
+        # Min-heap of (expire_at, key); overwritten/deleted keys are dropped lazily
+        self.expiry_heap: List[Tuple[float, str]] = []
+        self.lock = threading.Lock()
+
+
 class MemoryQueue:
     """
     内存消息队列 / In-Memory Message Queue
@@ -31,12 +112,14 @@ class MemoryQueue:
             cleanup_interval: 自动清理间隔(秒) / Auto cleanup interval in seconds
         """
         # 任务队列 / Task Queue
-        self._task_queue = queue.Queue()
+        # 无界队列，deque + Condition 即可，无需 queue.Queue 的容量与 join 记账
+        # Unbounded queue: a deque + Condition, without queue.Queue's maxsize/join bookkeeping
+        self._task_queue: Deque[Union[Dict[str, Any], NormalTask]] = deque()
+        self._task_cv = threading.Condition()
         
         # 公共信息存储 / Public Data Store
-        # 格式: {key: {"value": Any, "expire_at": float | None}}
-        self._public_store: Dict[str, Dict[str, Any]] = {}
-        self._store_lock = threading.Lock()
+        # 按 hash(key) 分片 / Sharded by hash(key)
+        self._shards = [_StoreShard() for _ in range(_STORE_SHARDS)]
         
         # 后台清理线程 / Background cleanup thread
         self._cleanup_interval = cleanup_interval
@@ -72,32 +155,56 @@ class MemoryQueue:
         while self._running:
             try:
                 self.cleanup()
-                time.sleep(self._cleanup_interval)
+                time.sleep(self._next_cleanup_delay())
             except Exception as e:
                 logger.error(f"清理线程异常 / Cleanup error: {e}")
     
+    def _next_cleanup_delay(self) -> float:
+        """
+        计算下次清理前的等待时间 / Compute wait time before next cleanup
+        
+        最早过期的键到期即唤醒，最长不超过清理间隔
+        Wake when the earliest key expires, capped at the cleanup interval
+        """
+        earliest = None
+        for shard in self._shards:
+            with shard.lock:
+                if shard.expiry_heap and (earliest is None or shard.expiry_heap[0][0] < earliest):
+                    earliest = shard.expiry_heap[0][0]
+        if earliest is None:
+            return self._cleanup_interval
+        return min(self._cleanup_interval, max(1.0, earliest - time.time()))
+    
     # ========== 任务队列接口 / Task Queue API ==========
     
-    def push_task(self, task: Dict[str, Any]) -> str:
+    def push_task(self, task: Union[Dict[str, Any], NormalTask]) -> str:
         """
         推入任务到队列 / Push task to queue
         
         Args:
-            task: 任务字典，必须包含 type 字段
-                  Task dict, must contain 'type' field
+            task: 任务字典(必须包含 type 字段)或 NormalTask
+                  Task dict (must contain 'type' field) or NormalTask
                   
         Returns:
             task_id: 任务ID / Task ID
         """
-        if "task_id" not in task:
-            task["task_id"] = str(uuid.uuid4())
-        
-        if "type" not in task:
-            raise ValueError("任务必须包含 'type' 字段 / Task must contain 'type' field")
+        if isinstance(task, NormalTask):
+            if not task.task_id:
+                task.task_id = _new_id().hex
+            task_id, task_type = task.task_id, task.type
+        else:
+            if "task_id" not in task:
+                task["task_id"] = _new_id().hex
+            
+            if "type" not in task:
+                raise ValueError("任务必须包含 'type' 字段 / Task must contain 'type' field")
+            task_id, task_type = task["task_id"], task["type"]
         
-        self._task_queue.put(task)
-        logger.info(f"任务已推入队列 / Task pushed: {task['task_id']} [{task['type']}]")
-        return task["task_id"]
+        with self._task_cv:
+            self._task_queue.append(task)
+            self._task_cv.notify()
+        logger.info("任务已推入队列 / Task pushed: {} [{}]", task_id, task_type)
+        return task_id
     
     def pop_task(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """
@@ -108,29 +215,41 @@ class MemoryQueue:
                      Timeout in seconds, None for blocking wait
                      
         Returns:
-            task: 任务字典，超时返回None / Task dict or None on timeout
+            task: 任务字典（NormalTask 出队时转换为字典），超时返回None
+                  Task dict (NormalTask is converted on pop), None on timeout
         """
-        try:
-            task = self._task_queue.get(timeout=timeout)
-            logger.info(f"任务已弹出 / Task popped: {task.get('task_id')} [{task.get('type')}]")
-            return task
-        except queue.Empty:
-            return None
+        with self._task_cv:
+            if not self._task_cv.wait_for(lambda: self._task_queue, timeout):
+                return None
+            task = self._task_queue.popleft()
+        
+        if isinstance(task, NormalTask):
+            task = task.to_dict()
+        logger.info("任务已弹出 / Task popped: {} [{}]", task.get("task_id"), task.get("type"))
+        return task
     
     def task_done(self):
-        """标记任务完成 / Mark task as done"""
-        self._task_queue.task_done()
+        """
+        标记任务完成 / Mark task as done
+        
+        保留以兼容现有 Worker，队列不再跟踪未完成任务
+        Kept for existing workers; the queue no longer tracks unfinished tasks
+        """
     
     def get_queue_size(self) -> int:
         """获取队列中任务数量 / Get queue size"""
-        return self._task_queue.qsize()
+        return len(self._task_queue)
     
     def is_empty(self) -> bool:
         """检查队列是否为空 / Check if queue is empty"""
-        return self._task_queue.empty()
+        return not self._task_queue
     
     # ========== 公共信息存储接口 / Public Data Store API ==========
     
+    def _shard(self, key: str) -> _StoreShard:
+        """获取键所在分片 / Get the shard holding key"""
+        return self._shards[hash(key) & (_STORE_SHARDS - 1)]
+    
     def set_public(self, key: str, value: Any, ttl: Optional[int] = None):
         """
         设置公共信息 / Set public data
@@ -141,15 +260,17 @@ class MemoryQueue:
             ttl: 过期时间(秒)，None表示永不过期
                  Time to live in seconds, None for no expiration
         """
-        expire_at = None if ttl is None else time.time() + ttl
+        shard = self._shard(key)
+        with shard.lock:
+            shard.values[key] = value
+            if ttl is None:
+                shard.expires.pop(key, None)
+            else:
+                expire_at = time.time() + ttl
+                shard.expires[key] = expire_at
+                heapq.heappush(shard.expiry_heap, (expire_at, key))
         
-        with self._store_lock:
-            self._public_store[key] = {
-                "value": value,
-                "expire_at": expire_at
-            }
-        
-        logger.debug(f"公共信息已设置 / Public data set: {key} (TTL: {ttl}s)")
+        logger.debug("公共信息已设置 / Public data set: {} (TTL: {}s)", key, ttl)
     
     def get_public(self, key: str) -> Optional[Any]:
         """
@@ -162,19 +283,33 @@ class MemoryQueue:
             value: 值，不存在或已过期返回None
                    Value or None if not exists or expired
         """
-        with self._store_lock:
-            if key not in self._public_store:
-                return None
-            
-            entry = self._public_store[key]
-            
-            # 检查是否过期 / Check expiration
-            if entry["expire_at"] is not None and time.time() > entry["expire_at"]:
-                del self._public_store[key]
-                logger.debug(f"公共信息已过期 / Public data expired: {key}")
+        shard = self._shard(key)
+        
+        # 读路径不加锁: dict.get 在 GIL 下是原子的，只有删除过期键时才加锁
+        # Lock-free read: dict.get is atomic under the GIL; lock only to drop expired keys
+        value = shard.values.get(key, _MISSING)
+        if value is _MISSING:
+            return None
+        
+        # 检查是否过期 / Check expiration
+        expire_at = shard.expires.get(key)
+        if expire_at is None or time.time() <= expire_at:
+            return value
+        
+        with shard.lock:
+            # 加锁后重新读取，期间可能已被覆盖 / Re-read under lock, key may have been reset
+            value = shard.values.get(key, _MISSING)
+            if value is _MISSING:
                 return None
+            expire_at = shard.expires.get(key)
+            if expire_at is None or time.time() <= expire_at:
+                return value
             
-            return entry["value"]
+            del shard.values[key]
+            del shard.expires[key]
+        
+        logger.debug("公共信息已过期 / Public data expired: {}", key)
+        return None
     
     def delete_public(self, key: str) -> bool:
         """
@@ -186,44 +321,58 @@ class MemoryQueue:
         Returns:
             success: 是否删除成功 / Whether deletion succeeded
         """
-        with self._store_lock:
-            if key in self._public_store:
-                del self._public_store[key]
-                logger.debug(f"公共信息已删除 / Public data deleted: {key}")
-                return True
-            return False
+        shard = self._shard(key)
+        with shard.lock:
+            if key not in shard.values:
+                return False
+            del shard.values[key]
+            shard.expires.pop(key, None)
+        
+        logger.debug("公共信息已删除 / Public data deleted: {}", key)
+        return True
     
     def cleanup(self):
         """清理过期的公共信息 / Cleanup expired public data"""
         now = time.time()
-        expired_keys = []
+        cleaned = 0
         
-        with self._store_lock:
-            for key, entry in self._public_store.items():
-                if entry["expire_at"] is not None and now > entry["expire_at"]:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self._public_store[key]
+        for shard in self._shards:
+            with shard.lock:
+                # 只弹出已到期的堆顶条目 / Only pop heap entries that are due
+                heap = shard.expiry_heap
+                while heap and heap[0][0] < now:
+                    expire_at, key = heapq.heappop(heap)
+                    # 时间戳不一致说明该键已被覆盖或删除 / Stale entry if timestamp differs
+                    if shard.expires.get(key) != expire_at:
+                        continue
+                    del shard.values[key]
+                    del shard.expires[key]
+                    cleaned += 1
         
-        if expired_keys:
-            logger.info(f"已清理 {len(expired_keys)} 条过期信息 / Cleaned {len(expired_keys)} expired entries")
+        if cleaned:
+            logger.info(f"已清理 {cleaned} 条过期信息 / Cleaned {cleaned} expired entries")
     
     def get_store_size(self) -> int:
-        """获取公共信息存储数量 / Get store size"""
-        with self._store_lock:
-            return len(self._public_store)
+        """获取公共信息存储数量(近似值) / Get store size (approximate)"""
+        return sum(len(shard.values) for shard in self._shards)
     
     def list_keys(self) -> list:
         """列出所有公共信息的键 / List all public data keys"""
-        with self._store_lock:
-            return list(self._public_store.keys())
+        keys = []
+        for shard in self._shards:
+            with shard.lock:
+                keys.extend(shard.values.keys())
+        return keys
     
     def clear_store(self):
         """清空公共信息存储 / Clear all public data"""
-        with self._store_lock:
-            count = len(self._public_store)
-            self._public_store.clear()
+        count = 0
+        for shard in self._shards:
+            with shard.lock:
+                count += len(shard.values)
+                shard.values.clear()
+                shard.expires.clear()
+                shard.expiry_heap.clear()
         logger.info(f"已清空 {count} 条公共信息 / Cleared {count} public data entries")
 
 
@@ -241,37 +390,43 @@ def get_queue() -> MemoryQueue:
     """
     global _global_queue
     
-    if _global_queue is None:
-        with _queue_lock:
-            if _global_queue is None:
-                _global_queue = MemoryQueue()
-                _global_queue.start_cleanup()
-                logger.info("全局消息队列已创建 / Global message queue created")
+    # 快速路径：已创建则直接返回 / Fast path: return directly once created
+    queue_instance = _global_queue
+    if queue_instance is not None:
+        return queue_instance
+    
+    with _queue_lock:
+        if _global_queue is None:
+            _global_queue = MemoryQueue()
+            _global_queue.start_cleanup()
+            logger.info("全局消息队列已创建 / Global message queue created")
     
     return _global_queue
 
 
 # 便捷函数 / Convenience functions
-def push_task(task: Dict[str, Any]) -> str:
+# 实例创建后直接读取模块级单例，跳过 get_queue() 调用
+# Read the module-level singleton directly once created, skipping get_queue()
+def push_task(task: Union[Dict[str, Any], NormalTask]) -> str:
     """推入任务 / Push task"""
-    return get_queue().push_task(task)
+    return (_global_queue or get_queue()).push_task(task)
 
 
 def pop_task(timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
     """弹出任务 / Pop task"""
-    return get_queue().pop_task(timeout)
+    return (_global_queue or get_queue()).pop_task(timeout)
 
 
 def set_public(key: str, value: Any, ttl: Optional[int] = None):
     """设置公共信息 / Set public data"""
-    get_queue().set_public(key, value, ttl)
+    (_global_queue or get_queue()).set_public(key, value, ttl)
 
 
 def get_public(key: str) -> Optional[Any]:
     """获取公共信息 / Get public data"""
-    return get_queue().get_public(key)
+    return (_global_queue or get_queue()).get_public(key)
 
 
 def delete_public(key: str) -> bool:
     """删除公共信息 / Delete public data"""
-    return get_queue().delete_public(key)
+    return (_global_queue or get_queue()).delete_public(key)
@@ -0,0 +1,147 @@
+"""
+播放次数缓冲模块 / Play Count Buffer Module
+
+在内存中累计播放次数，由后台线程定期批量写回数据库
+Accumulates play counts in memory and flushes them to the database in batches
+"""
+
+import threading
+from collections import Counter
+from typing import Optional
+from sqlalchemy import case, update
+
+from app.database import SessionLocal
+from app.models.music import Music
+from app.log import logger
+
+
+class PlayCountBuffer:
+    """
+    播放次数缓冲 / Play count buffer
+
+    特性 / Features:
+    - 播放请求只在内存中计数，不写数据库 / Playback only counts in memory
+    - 后台线程定期用一条 UPDATE 写回 / Background thread flushes with one UPDATE
+    - 关闭时写回剩余计数 / Remaining counts are flushed on shutdown
+    """
+
+    def __init__(self, flush_interval: int = 30):
+        """
+        初始化播放次数缓冲
+
+        Args:
+            flush_interval: 写回间隔(秒) / Flush interval in seconds
+        """
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+        # 后台写回线程 / Background flush thread
+        self._flush_interval = flush_interval
+        self._flush_thread = None
+        self._stop_event = threading.Event()
+
+    def increment(self, uuid: str):
+        """
+        播放次数 +1 / Increment play count
+
+        Args:
+            uuid: 音乐UUID / Music UUID
+        """
+        with self._lock:
+            self._counts[uuid] += 1
+
+    def pending(self) -> int:
+        """待写回的音乐数量 / Number of musics pending flush"""
+        return len(self._counts)
+
+    def flush(self) -> int:
+        """
+        将累计的播放次数写回数据库 / Flush accumulated counts to database
+
+        Returns:
+            count: 写回的音乐数量 / Number of musics flushed
+        """
+        # 交换出当前计数，写库期间的新播放进入新的 Counter
+        # Swap out current counts; plays during the write go to a fresh Counter
+        with self._lock:
+            if not self._counts:
+                return 0
+            counts, self._counts = self._counts, Counter()
+
+        db = SessionLocal()
+        try:
+            # UPDATE music SET play_count = play_count + CASE uuid ... END WHERE uuid IN (...)
+            db.execute(
+                update(Music)
+                .where(Music.uuid.in_(counts.keys()))
+                .values(play_count=Music.play_count + case(counts, value=Music.uuid, else_=0))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            logger.debug("播放次数已写回 / Play counts flushed: {} musics", len(counts))
+            return len(counts)
+        except Exception as e:
+            db.rollback()
+            # 写回失败时把计数放回，下次重试 / Put counts back for the next attempt
+            with self._lock:
+                self._counts.update(counts)
+            logger.error(f"播放次数写回失败 / Play count flush failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def start(self):
+        """启动后台写回线程 / Start background flush thread"""
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            logger.warning("播放次数写回线程已在运行 / Play count flush thread already running")
+            return
+
+        self._stop_event.clear()
+        self._flush_thread = threading.Thread(
+            target=self._flush_worker,
+            daemon=True,
+            name="PlayCount-Flush"
+        )
+        self._flush_thread.start()
+        logger.info("播放次数写回线程已启动 / Play count flush thread started")
+
+    def stop(self):
+        """停止后台写回线程并写回剩余计数 / Stop flush thread and flush remaining counts"""
+        self._stop_event.set()
+        if self._flush_thread:
+            self._flush_thread.join(timeout=5)
+        self.flush()
+        logger.info("播放次数写回线程已停止 / Play count flush thread stopped")
+
+    def _flush_worker(self):
+        """后台写回工作线程 / Background flush worker"""
+        while not self._stop_event.wait(self._flush_interval):
+            self.flush()
+
+
+# 全局单例 / Global singleton instance
+_global_counter: Optional[PlayCountBuffer] = None
+_counter_lock = threading.Lock()
+
+
+def get_play_counter() -> PlayCountBuffer:
+    """
+    获取全局播放次数缓冲实例 / Get global play count buffer instance
+
+    Returns:
+        counter: 播放次数缓冲实例 / Play count buffer instance
+    """
+    global _global_counter
+
+    # 快速路径：已创建则直接返回 / Fast path: return directly once created
+    counter = _global_counter
+    if counter is not None:
+        return counter
+
+    with _counter_lock:
+        if _global_counter is None:
+            _global_counter = PlayCountBuffer()
+            _global_counter.start()
+            logger.info("全局播放次数缓冲已创建 / Global play count buffer created")
+
+    return _global_counter
@@ -5,20 +5,36 @@
 Supports interval scheduling, Cron expressions, and one-time execution
 """
 
-import json
+import heapq
 import time
 import threading
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+import orjson
+from croniter import croniter, CroniterBadCronError
+from sqlalchemy import or_, update
 
 from app.database import SessionLocal
 from app.models.scheduler_task import SchedulerTask, TaskQueue
-from app.core.message_queue import get_queue
+from app.core.message_queue import NormalTask, get_queue
 from app.log import logger
 
 
+def _dumps(obj: Any) -> str:
+    """序列化任务参数 / Serialize task params (orjson, non-str keys allowed like json)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+_loads = orjson.loads
+
+# 未达到最大执行次数(max_runs=0 表示无限制) / Max runs not reached (0 = unlimited)
+_BELOW_MAX_RUNS = or_(SchedulerTask.max_runs == 0, SchedulerTask.run_count < SchedulerTask.max_runs)
+
+# 任务ID生成器，取 .hex 得到32位无连字符ID / Task ID factory; .hex gives a 32-char id
+_new_id = uuid.uuid4
+
+
 class Scheduler:
     """
     定时任务调度器 / Task Scheduler
@@ -29,6 +45,7 @@ class Scheduler:
     - 支持单次执行 / One-time execution
     - 数据库持久化 / Database persistence
     - 动态添加/删除任务 / Dynamic task management
+    - 事件驱动唤醒，到期即执行 / Event-driven wakeup, runs tasks when due
     """
     
     def __init__(self, check_interval: int = 60):
@@ -36,13 +53,26 @@ class Scheduler:
         初始化调度器
         
         Args:
-            check_interval: 检查间隔(秒) / Check interval in seconds
+            check_interval: 与数据库重新同步的间隔(秒)，用于发现外部修改的任务
+                            Interval in seconds for re-syncing with the database,
+                            picks up tasks changed outside this scheduler
         """
         self._check_interval = check_interval
         self._running = False
         self._scheduler_thread = None
         self._lock = threading.Lock()
         
+        # 内存调度表: 最小堆 (next_run_at, task_id)，以 _scheduled 为准惰性剔除过期条目
+        # In-memory schedule: min-heap of (next_run_at, task_id); entries that no
+        # longer match _scheduled are dropped lazily
+        self._heap: List[Tuple[int, str]] = []
+        self._scheduled: Dict[str, int] = {}
+        self._last_sync = 0.0
+        self._wake = threading.Event()
+        
+        # 已解析的Cron表达式缓存 / Parsed Cron expression cache
+        self._cron_cache: Dict[str, croniter] = {}
+        
         logger.info(f"调度器已初始化 / Scheduler initialized (check_interval={check_interval}s)")
     
     def start(self):
@@ -63,6 +93,7 @@ class Scheduler:
     def stop(self):
         """停止调度器 / Stop scheduler"""
         self._running = False
+        self._wake.set()
         if self._scheduler_thread:
             self._scheduler_thread.join(timeout=10)
             logger.info("调度器已停止 / Scheduler stopped")
@@ -73,122 +104,212 @@ class Scheduler:
         
         while self._running:
             try:
-                self._check_and_execute_tasks()
-                time.sleep(self._check_interval)
+                now = time.time()
+                
+                # 定期与数据库同步 / Periodically re-sync with the database
+                if now - self._last_sync >= self._check_interval:
+                    self._load_schedule()
+                    now = time.time()
+                
+                # 等待到最近任务到期、下次同步或被唤醒
+                # Wait until the next task is due, the next sync, or a wakeup
+                timeout = self._check_interval - (now - self._last_sync)
+                delay = self._next_delay(now)
+                if delay is not None:
+                    timeout = min(timeout, delay)
+                if timeout > 0:
+                    self._wake.wait(timeout)
+                    self._wake.clear()
+                    continue
+                
+                if self._pop_due(now):
+                    self._check_and_execute_tasks()
             except Exception as e:
                 logger.error(f"调度器异常 / Scheduler error: {e}", exc_info=True)
                 time.sleep(5)
     
+    # ========== 内存调度表 / In-Memory Schedule ==========
+    
+    def _load_schedule(self):
+        """从数据库加载启用任务的下次执行时间 / Load next run times of enabled tasks"""
+        self._last_sync = time.time()
+        db = SessionLocal()
+        try:
+            rows = db.query(SchedulerTask.task_id, SchedulerTask.next_run_at).filter(
+                SchedulerTask.enabled == True,
+                SchedulerTask.next_run_at.isnot(None),
+                _BELOW_MAX_RUNS
+            ).all()
+        except Exception as e:
+            logger.error(f"加载调度表失败 / Load schedule failed: {e}")
+            return
+        finally:
+            db.close()
+        
+        with self._lock:
+            self._scheduled = {task_id: next_run_at for task_id, next_run_at in rows}
+            self._heap = [(next_run_at, task_id) for task_id, next_run_at in rows]
+            heapq.heapify(self._heap)
+        
+        logger.debug("调度表已同步 / Schedule synced: {} tasks", len(rows))
+    
+    def _schedule(self, task_id: str, next_run_at: Optional[int]):
+        """登记任务下次执行时间并唤醒工作线程 / Schedule task and wake the worker"""
+        if next_run_at is None:
+            self._unschedule(task_id)
+            return
+        with self._lock:
+            self._scheduled[task_id] = next_run_at
+            heapq.heappush(self._heap, (next_run_at, task_id))
+        self._wake.set()
+    
+    def _unschedule(self, task_id: str):
+        """移除任务，堆中条目惰性剔除 / Unschedule task; heap entry is dropped lazily"""
+        with self._lock:
+            self._scheduled.pop(task_id, None)
+    
+    def _next_delay(self, now: float) -> Optional[float]:
+        """距最近任务到期的秒数，无任务返回None / Seconds until next due task, None if empty"""
+        with self._lock:
+            heap = self._heap
+            while heap and self._scheduled.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if not heap:
+                return None
+            return heap[0][0] - now
+    
+    def _pop_due(self, now: float) -> bool:
+        """弹出所有到期任务，返回是否有任务到期 / Pop due entries, return whether any was due"""
+        due = False
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                next_run_at, task_id = heapq.heappop(heap)
+                if self._scheduled.get(task_id) == next_run_at:
+                    del self._scheduled[task_id]
+                    due = True
+        return due
+    
     def _check_and_execute_tasks(self):
         """检查并执行到期任务 / Check and execute due tasks"""
         db = SessionLocal()
         try:
             now = int(time.time())
             
-            # 只查询启用且到期的任务，减少数据库压力
-            # Query only enabled and due tasks to reduce database load
+            # 只查询启用且到期的任务（命中 enabled+next_run_at 索引），分批流式读取
+            # Query only enabled and due tasks (uses the enabled+next_run_at index), streamed in batches
             tasks = db.query(SchedulerTask).filter(
                 SchedulerTask.enabled == True,
-                SchedulerTask.next_run_at <= now
-            ).all()
+                SchedulerTask.next_run_at <= now,
+                _BELOW_MAX_RUNS
+            ).order_by(SchedulerTask.next_run_at).yield_per(100)
             
-            logger.debug(f"检查到 {len(tasks)} 个到期任务 / Found {len(tasks)} due tasks")
+            # 收集状态更新与待持久化任务，循环结束后批量写入
+            # Collect status updates and queue rows, then write them in bulk
+            updates: List[Dict[str, Any]] = []
+            queue_rows: List[TaskQueue] = []
             
             for task in tasks:
                 try:
-                    self._execute_task(task, now, db)
+                    result = self._execute_task(task, now)
+                    if result:
+                        task_update, queue_row = result
+                        updates.append(task_update)
+                        queue_rows.append(queue_row)
                 except Exception as e:
                     logger.error(f"执行任务失败 / Task execution failed [{task.task_id}]: {e}")
             
+            logger.debug("已执行 {0} 个到期任务 / Executed {0} due tasks", len(updates))
+            
+            if updates:
+                # 按主键批量 UPDATE / Bulk UPDATE by primary key
+                db.execute(update(SchedulerTask), updates)
+                db.add_all(queue_rows)
+            
             db.commit()
             
+            # 按新状态更新内存调度表 / Refresh the in-memory schedule
+            for task_update in updates:
+                if task_update.get("enabled", True):
+                    self._schedule(task_update["task_id"], task_update["next_run_at"])
+                else:
+                    self._unschedule(task_update["task_id"])
+            
         except Exception as e:
             logger.error(f"检查任务列表失败 / Task list check failed: {e}")
             db.rollback()
         finally:
             db.close()
     
-    def _should_execute(self, task: SchedulerTask, now: int) -> bool:
+    def _execute_task(
+        self, task: SchedulerTask, now: int
+    ) -> Optional[Tuple[Dict[str, Any], TaskQueue]]:
         """
-        判断任务是否应该执行 / Check if task should execute
+        执行定时任务 / Execute scheduled task
+        
+        推送普通任务到队列，并返回定时任务的状态更新和待持久化的队列记录，
+        由调用方统一批量写入数据库
+        Push the normal task to the queue and return the scheduled task's
+        status update plus the queue row, which the caller writes in bulk
         
         Args:
             task: 定时任务对象 / Scheduled task object
             now: 当前时间戳 / Current timestamp
             
         Returns:
-            should_execute: 是否应该执行 / Whether should execute
-        """
-        # 检查是否达到最大执行次数 / Check max runs
-        max_runs = getattr(task, 'max_runs', 0)
-        run_count = getattr(task, 'run_count', 0)
-        if max_runs > 0 and run_count >= max_runs:
-            return False
-        
-        # 首次执行 / First execution
-        next_run_at = getattr(task, 'next_run_at', None)
-        if next_run_at is None:
-            return True
-        
-        # 检查是否到期 / Check if due
-        return now >= next_run_at
-    
-    def _execute_task(self, task: SchedulerTask, now: int, db: Session):
-        """
-        执行定时任务 / Execute scheduled task
-        
-        Args:
-            task: 定时任务对象 / Scheduled task object
-            now: 当前时间戳 / Current timestamp
-            db: 数据库会话 / Database session
+            (update, queue_row): 状态更新映射和队列记录，失败返回None
+                                 Status update mapping and queue row, None on failure
         """
         try:
             # 解析任务参数 / Parse task parameters
-            params_str = getattr(task, 'params', None)
-            params = json.loads(params_str) if params_str else {}
+            params_str = task.params
+            params = _loads(params_str) if params_str else {}
             
             # 生成普通任务并推入队列 / Generate normal task and push to queue
-            normal_task = {
-                "task_id": str(uuid.uuid4()),
-                "type": getattr(task, 'task_type'),
-                "params": params,
-                "scheduler_task_id": getattr(task, 'task_id'),
-                "scheduler_task_name": getattr(task, 'name')
-            }
+            normal_task = NormalTask(
+                _new_id().hex,
+                task.task_type,
+                params,
+                scheduler_task_id=task.task_id,
+                scheduler_task_name=task.name
+            )
             
             # 推入队列 / Push to queue
             queue = get_queue()
             task_id = queue.push_task(normal_task)
             
             # 可选:持久化到数据库 / Optional: Persist to database
-            self._persist_task(normal_task, db)
-            
-            # 更新定时任务状态 / Update scheduled task status
-            setattr(task, 'last_run_at', now)
-            run_count = getattr(task, 'run_count', 0)
-            setattr(task, 'run_count', run_count + 1)
+            queue_row = self._persist_task(normal_task, now)
             
-            # 计算下次执行时间 / Calculate next run time
+            # 计算定时任务新状态 / Compute new scheduled task status
+            run_count = task.run_count + 1
             next_run = self._calculate_next_run(task, now)
-            setattr(task, 'next_run_at', next_run)
+            update_values = {
+                "task_id": task.task_id,
+                "last_run_at": now,
+                "run_count": run_count,
+                "next_run_at": next_run,
+                "updated_at": now,
+            }
             
             # 如果是单次任务或达到最大次数,禁用任务 / Disable if one-time or max runs reached
-            schedule_type = getattr(task, 'schedule_type')
-            max_runs = getattr(task, 'max_runs', 0)
-            if schedule_type == "once" or (max_runs > 0 and run_count + 1 >= max_runs):
-                setattr(task, 'enabled', False)
-                logger.info(f"定时任务已完成并禁用 / Scheduled task completed and disabled: {getattr(task, 'name')}")
-            
-            setattr(task, 'updated_at', now)
+            schedule_type = task.schedule_type
+            max_runs = task.max_runs
+            if schedule_type == "once" or (max_runs > 0 and run_count >= max_runs):
+                update_values["enabled"] = False
+                logger.info("定时任务已完成并禁用 / Scheduled task completed and disabled: {}", task.name)
             
             logger.info(
-                f"定时任务已执行 / Scheduled task executed: {getattr(task, 'name')} "
-                f"[{getattr(task, 'task_id')}] -> Normal Task [{task_id}], "
-                f"run_count={run_count + 1}, next_run_at={next_run}"
+                "定时任务已执行 / Scheduled task executed: {} [{}] -> Normal Task [{}], "
+                "run_count={}, next_run_at={}",
+                task.name, task.task_id, task_id, run_count, next_run
             )
             
+            return update_values, queue_row
+            
         except Exception as e:
-            logger.error(f"执行定时任务失败 / Execute scheduled task failed [{getattr(task, 'task_id')}]: {e}")
+            logger.error(f"执行定时任务失败 / Execute scheduled task failed [{task.task_id}]: {e}")
+            return None
     
     def _calculate_next_run(self, task: SchedulerTask, now: int) -> Optional[int]:
         """
@@ -201,21 +322,20 @@ class Scheduler:
         Returns:
             next_run_at: 下次执行时间戳 / Next run timestamp
         """
-        schedule_type = getattr(task, 'schedule_type')
+        schedule_type = task.schedule_type
         
         if schedule_type == "once":
             return None
         
         elif schedule_type == "interval":
-            interval_seconds = getattr(task, 'interval_seconds', None)
+            interval_seconds = task.interval_seconds
             if interval_seconds:
                 return now + interval_seconds
             return None
         
         elif schedule_type == "cron":
-            # 简化实现:支持基本Cron表达式解析
-            # Simplified: Basic Cron expression parsing
-            cron_expression = getattr(task, 'cron_expression', None)
+            # 按Cron表达式计算 / Compute from Cron expression
+            cron_expression = task.cron_expression
             if cron_expression:
                 return self._parse_cron_next_run(cron_expression, now)
             return None
@@ -226,8 +346,8 @@ class Scheduler:
         """
         解析Cron表达式计算下次执行时间 / Parse Cron expression for next run
         
-        简化实现,支持格式: "* * * * *" (分 时 日 月 周)
-        Simplified implementation, supports: "minute hour day month weekday"
+        使用 croniter 解析，格式: "* * * * *" (分 时 日 月 周)，按本地时间计算
+        Parsed by croniter, format: "minute hour day month weekday", local time
         
         Args:
             cron_expr: Cron表达式 / Cron expression
@@ -237,61 +357,45 @@ class Scheduler:
             next_run_at: 下次执行时间戳 / Next run timestamp
         """
         try:
-            # 这里提供一个简化实现,实际项目可以使用croniter库
-            # This is a simplified implementation. Use croniter library in production.
+            base = datetime.fromtimestamp(now).astimezone()
             
-            parts = cron_expr.split()
-            if len(parts) != 5:
-                logger.warning(f"无效的Cron表达式 / Invalid Cron expression: {cron_expr}")
-                return None
+            # 复用已解析的表达式，避免重复分词 / Reuse parsed expressions
+            itr = self._cron_cache.get(cron_expr)
+            if itr is None:
+                itr = croniter(cron_expr, base)
+                self._cron_cache[cron_expr] = itr
+            else:
+                itr.set_current(base)
             
-            # 简单处理:如果是 "*/N * * * *" 格式,表示每N分钟执行
-            # Simple handling: "*/N * * * *" means every N minutes
-            if parts[0].startswith("*/"):
-                minutes = int(parts[0][2:])
-                return now + (minutes * 60)
-            
-            # 如果是 "0 * * * *" 格式,表示每小时整点执行
-            # "0 * * * *" means every hour at minute 0
-            if parts[0] == "0" and parts[1] == "*":
-                current_dt = datetime.fromtimestamp(now)
-                next_hour = current_dt.replace(minute=0, second=0, microsecond=0)
-                next_hour = datetime(
-                    next_hour.year, next_hour.month, next_hour.day,
-                    next_hour.hour + 1, 0, 0
-                )
-                return int(next_hour.timestamp())
-            
-            # 默认1小时后执行 / Default: 1 hour later
-            logger.warning(f"Cron表达式解析未完全实现,使用默认间隔 / Cron parsing not fully implemented: {cron_expr}")
-            return now + 3600
+            return int(itr.get_next(float))
             
+        except (CroniterBadCronError, ValueError) as e:
+            logger.warning(f"无效的Cron表达式 / Invalid Cron expression: {cron_expr} ({e})")
+            return None
         except Exception as e:
             logger.error(f"解析Cron表达式失败 / Parse Cron failed: {e}")
             return None
     
-    def _persist_task(self, task: Dict[str, Any], db: Session):
+    def _persist_task(self, task: NormalTask, now: int) -> TaskQueue:
         """
-        持久化普通任务到数据库 / Persist normal task to database
+        构建普通任务的持久化记录 / Build persistence row for a normal task
         
         Args:
-            task: 任务字典 / Task dict
-            db: 数据库会话 / Database session
+            task: 普通任务 / Normal task
+            now: 本轮调度的时间戳 / Timestamp of the current scheduler tick
+            
+        Returns:
+            task_queue: 待写入数据库的队列记录 / Queue row to be written
         """
-        try:
-            task_queue = TaskQueue(
-                task_id=task["task_id"],
-                task_type=task["type"],
-                params=json.dumps(task.get("params", {})),
-                status="pending",
-                priority=task.get("priority", 0),
-                created_at=int(time.time()),
-                scheduler_task_id=task.get("scheduler_task_id")
-            )
-            db.add(task_queue)
-            logger.debug(f"任务已持久化 / Task persisted: {task['task_id']}")
-        except Exception as e:
-            logger.error(f"持久化任务失败 / Persist task failed: {e}")
+        return TaskQueue(
+            task_id=task.task_id,
+            task_type=task.type,
+            params=_dumps(task.params),
+            status="pending",
+            priority=task.priority,
+            created_at=now,
+            scheduler_task_id=task.scheduler_task_id
+        )
     
     # ========== 管理接口 / Management API ==========
     
@@ -327,7 +431,7 @@ class Scheduler:
         db = SessionLocal()
         try:
             now = int(time.time())
-            task_id = str(uuid.uuid4())
+            task_id = _new_id().hex
             
             # 计算首次执行时间 / Calculate first run time
             next_run_at = execute_at if execute_at else now
@@ -336,7 +440,7 @@ class Scheduler:
                 task_id=task_id,
                 name=name,
                 task_type=task_type,
-                params=json.dumps(params) if params else None,
+                params=_dumps(params) if params else None,
                 schedule_type=schedule_type,
                 interval_seconds=interval_seconds,
                 cron_expression=cron_expression,
@@ -351,6 +455,7 @@ class Scheduler:
             
             db.add(task)
             db.commit()
+            self._schedule(task_id, next_run_at)
             
             logger.info(f"定时任务已添加 / Scheduled task added: {name} [{task_id}]")
             return task_id
@@ -368,10 +473,11 @@ class Scheduler:
         try:
             task = db.query(SchedulerTask).filter(SchedulerTask.task_id == task_id).first()
             if task:
-                setattr(task, 'enabled', False)
-                setattr(task, 'updated_at', int(time.time()))
+                task.enabled = False
+                task.updated_at = int(time.time())
                 db.commit()
-                logger.info(f"定时任务已暂停 / Scheduled task paused: {getattr(task, 'name')} [{task_id}]")
+                self._unschedule(task_id)
+                logger.info(f"定时任务已暂停 / Scheduled task paused: {task.name} [{task_id}]")
                 return True
             return False
         except Exception as e:
@@ -387,10 +493,11 @@ class Scheduler:
         try:
             task = db.query(SchedulerTask).filter(SchedulerTask.task_id == task_id).first()
             if task:
-                setattr(task, 'enabled', True)
-                setattr(task, 'updated_at', int(time.time()))
+                task.enabled = True
+                task.updated_at = int(time.time())
                 db.commit()
-                logger.info(f"定时任务已恢复 / Scheduled task resumed: {getattr(task, 'name')} [{task_id}]")
+                self._schedule(task_id, task.next_run_at)
+                logger.info(f"定时任务已恢复 / Scheduled task resumed: {task.name} [{task_id}]")
                 return True
             return False
         except Exception as e:
@@ -408,6 +515,7 @@ class Scheduler:
             if task:
                 db.delete(task)
                 db.commit()
+                self._unschedule(task_id)
                 logger.info(f"定时任务已删除 / Scheduled task deleted: {task.name} [{task_id}]")
                 return True
             return False
@@ -473,24 +581,24 @@ class Scheduler:
             if not task:
                 return None
             
-            params_str = getattr(task, 'params', None)
+            params_str = task.params
             return {
-                "task_id": getattr(task, 'task_id'),
-                "name": getattr(task, 'name'),
-                "task_type": getattr(task, 'task_type'),
-                "params": json.loads(params_str) if params_str else {},
-                "schedule_type": getattr(task, 'schedule_type'),
-                "interval_seconds": getattr(task, 'interval_seconds'),
-                "cron_expression": getattr(task, 'cron_expression'),
-                "execute_at": getattr(task, 'execute_at'),
-                "enabled": getattr(task, 'enabled'),
-                "run_count": getattr(task, 'run_count'),
-                "max_runs": getattr(task, 'max_runs'),
-                "last_run_at": getattr(task, 'last_run_at'),
-                "next_run_at": getattr(task, 'next_run_at'),
-                "created_at": getattr(task, 'created_at'),
-                "updated_at": getattr(task, 'updated_at'),
-                "description": getattr(task, 'description')
+                "task_id": task.task_id,
+                "name": task.name,
+                "task_type": task.task_type,
+                "params": _loads(params_str) if params_str else {},
+                "schedule_type": task.schedule_type,
+                "interval_seconds": task.interval_seconds,
+                "cron_expression": task.cron_expression,
+                "execute_at": task.execute_at,
+                "enabled": task.enabled,
+                "run_count": task.run_count,
+                "max_runs": task.max_runs,
+                "last_run_at": task.last_run_at,
+                "next_run_at": task.next_run_at,
+                "created_at": task.created_at,
+                "updated_at": task.updated_at,
+                "description": task.description
             }
             
         finally:
@@ -511,11 +619,15 @@ def get_scheduler() -> Scheduler:
     """
     global _global_scheduler
     
-    if _global_scheduler is None:
-        with _scheduler_lock:
-            if _global_scheduler is None:
-                _global_scheduler = Scheduler()
-                _global_scheduler.start()
-                logger.info("全局调度器已创建 / Global scheduler created")
+    # 快速路径：已创建则直接返回 / Fast path: return directly once created
+    scheduler = _global_scheduler
+    if scheduler is not None:
+        return scheduler
+    
+    with _scheduler_lock:
+        if _global_scheduler is None:
+            _global_scheduler = Scheduler()
+            _global_scheduler.start()
+            logger.info("全局调度器已创建 / Global scheduler created")
     
     return _global_scheduler
@@ -1,34 +1,48 @@
 """
 SQLAlchemy MySQL 数据库连接与会话管理
 """
+from importlib.util import find_spec
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 from sqlalchemy.pool import QueuePool
-from dotenv import load_dotenv
-import os
 
-# 加载 .env 文件
-load_dotenv()
+from app.config import Config
+
+# 数据库配置统一由 Config 提供
+MYSQL_USER = Config.MYSQL_USER
+MYSQL_PASSWORD = Config.MYSQL_PASSWORD
+MYSQL_HOST = Config.MYSQL_HOST
+MYSQL_PORT = Config.MYSQL_PORT
+MYSQL_DB = Config.MYSQL_DB
+DB_ECHO = Config.DB_ECHO
+
 
-# 从环境变量读取数据库配置
-MYSQL_USER = os.getenv("MYSQL_USER", "root")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "123456")
-MYSQL_HOST = os.getenv("MYSQL_HOST", "127.0.0.1")
-MYSQL_PORT = os.getenv("MYSQL_PORT", "3306")
-MYSQL_DB = os.getenv("MYSQL_DB", "music_db")
-DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+def _resolve_driver(driver: str) -> str:
+    """
+    选择 MySQL 驱动
+    优先使用 C 扩展 mysqlclient（行解码在 C 中完成），未安装时回退到纯 Python 的 pymysql
+    """
+    if driver == "auto":
+        return "mysqldb" if find_spec("MySQLdb") is not None else "pymysql"
+    return driver
+
+
+MYSQL_DRIVER = _resolve_driver(Config.MYSQL_DRIVER)
 
 SQLALCHEMY_DATABASE_URL = (
-    f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}?charset=utf8mb4"
+    f"mysql+{MYSQL_DRIVER}://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}?charset=utf8mb4"
 )
 
 # 创建引擎
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
-    pool_recycle=1800,
+    pool_size=Config.MYSQL_POOL_SIZE,
+    max_overflow=Config.MYSQL_MAX_OVERFLOW,
+    pool_recycle=Config.MYSQL_POOL_RECYCLE,
+    pool_timeout=Config.MYSQL_POOL_TIMEOUT,  # 连接池耗尽时最多等待的秒数，超时抛错而不是一直挂起
+    pool_pre_ping=Config.MYSQL_POOL_PRE_PING,  # 取出连接前 ping 一次，避免 "MySQL server has gone away"
     echo=DB_ECHO  # 从环境变量读取是否打印 SQL 日志
 )
 
@@ -41,11 +55,26 @@ Base = declarative_base()
 # 公共方法
 
 def get_db():
-    """FastAPI依赖注入用，获取数据库会话"""
-    db = SessionLocal()
+    """
+    FastAPI依赖注入用，获取数据库会话
+    每个请求新建独立会话：同步路由在线程池中执行，线程局部的 scoped_session 可能被不同请求共用
+    """
+    db = SessionLocal.session_factory()
     try:
         yield db
     finally:
         db.close()
 
-__all__ = ["engine", "SessionLocal", "Base", "get_db"]
+def init_db():
+    """
+    创建尚不存在的表（应用启动或命令行工具开始时调用一次）
+    不在模块导入时执行，避免每次导入都查询 information_schema
+    已存在的表不会补建索引或字段，升级表结构需手动执行 SQL（见 docs/README.md）
+    """
+    # 导入全部模型，确保元数据完整
+    import app.models.music  # noqa: F401
+    import app.models.device  # noqa: F401
+    import app.models.scheduler_task  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+
+__all__ = ["engine", "SessionLocal", "Base", "get_db", "init_db"]
@@ -6,7 +6,9 @@ from loguru import logger
 import sys
 import os
 
-LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "logs")
+from app.config import Config
+
+LOG_DIR = Config.LOG_DIR
 os.makedirs(LOG_DIR, exist_ok=True)
 
 logger.remove()
@@ -14,12 +16,14 @@ logger.remove()
 logger.add(sys.stdout, level="INFO", format="[{time:YYYY-MM-DD HH:mm:ss}] [{level}] {message}")
 
 # 文件输出，自动分割、保留10天
+# enqueue=True: 写文件交给后台线程，请求线程只负责入队
 logger.add(
 	os.path.join(LOG_DIR, "app_{time:YYYYMMDD}.log"),
 	rotation="10 MB",
 	retention="10 days",
 	level="INFO",
 	encoding="utf-8",
+	enqueue=True,
 	format="[{time:YYYY-MM-DD HH:mm:ss}] [{level}] {message}"
 )
 
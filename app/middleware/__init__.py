@@ -2,5 +2,6 @@
 中间件模块
 """
 from app.middleware.auth import TokenAuthMiddleware
+from app.middleware.gzip import SelectiveGZipMiddleware
 
-__all__ = ["TokenAuthMiddleware"]
+__all__ = ["TokenAuthMiddleware", "SelectiveGZipMiddleware"]
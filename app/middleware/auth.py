@@ -2,88 +2,131 @@
 认证中间件
 基于 STATIC_TOKEN 的简单认证机制
 """
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import hmac
+from starlette.types import ASGIApp, Receive, Scope, Send
 from app.config import Config
 from app.log import logger
 
 
-class TokenAuthMiddleware(BaseHTTPMiddleware):
+# 预编码的 401 响应体 / Pre-encoded 401 response bodies
+_MISSING_TOKEN_BODY = b'{"detail":"Missing authentication token"}'
+_INVALID_FORMAT_BODY = b'{"detail":"Invalid authentication token format. Expected: Bearer <token>"}'
+_INVALID_TOKEN_BODY = b'{"detail":"Invalid authentication token"}'
+
+
+def _unauthorized_headers(body: bytes) -> tuple:
+    """构建 401 响应头（导入时计算一次）/ Build 401 response headers once at import"""
+    return (
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"www-authenticate", b"Bearer"),
+    )
+
+
+# 每个响应体对应的预编码响应头 / Pre-encoded headers for each response body
+_UNAUTH_HEADERS = {
+    body: _unauthorized_headers(body)
+    for body in (_MISSING_TOKEN_BODY, _INVALID_FORMAT_BODY, _INVALID_TOKEN_BODY)
+}
+
+# 预编码的期望令牌，按字节做常量时间比较 / Pre-encoded expected token for constant-time byte compare
+_EXPECTED_TOKEN = Config.STATIC_TOKEN.encode()
+_EXPECTED_HEADER = b"Bearer " + _EXPECTED_TOKEN
+
+
+class TokenAuthMiddleware:
     """
     Token 认证中间件
     验证请求头中的 Authorization Token
+
+    纯 ASGI 实现，不经过 BaseHTTPMiddleware 的 Request/Response 包装
+    Pure ASGI, skipping BaseHTTPMiddleware's Request/Response wrapping
+
+    每个请求都会经过这里（热路径），只在认证失败时记录日志
+    Every request passes through here (hot path); only failures are logged
     """
-    
+
     # 不需要认证的路径（白名单）
-    WHITELIST_PATHS = [
+    # 精确匹配：frozenset 哈希查找
+    WHITELIST_EXACT = frozenset({
+        "/",
         "/docs",
         "/redoc",
         "/openapi.json",
-        "/",
-    ]
-    
-    async def dispatch(self, request: Request, call_next):
+    })
+    # 前缀匹配：str.startswith(tuple) 一次 C 调用，覆盖 /docs/oauth2-redirect 等子路径
+    WHITELIST_PREFIXES = (
+        "/docs/",
+        "/redoc/",
+    )
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         """
         处理请求
-        
+
         Args:
-            request: 请求对象
-            call_next: 下一个中间件或路由处理器
-            
-        Returns:
-            响应对象
+            scope: ASGI 连接信息
+            receive: ASGI 接收通道
+            send: ASGI 发送通道
         """
+        # 非 HTTP 连接（lifespan / websocket）直接放行
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
         # 检查路径是否在白名单中
-        if self._is_whitelisted(request.url.path):
-            return await call_next(request)
-        
-        # 获取 Authorization 头
-        auth_header = request.headers.get("Authorization")
-        
+        if path in self.WHITELIST_EXACT or path.startswith(self.WHITELIST_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        # 获取 Authorization 头（ASGI 头名已是小写字节串）
+        auth_header = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value
+                break
+
         if not auth_header:
-            logger.warning(f"未提供认证令牌 | Missing token: {request.url.path}")
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Missing authentication token"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # 验证 Token 格式 (Bearer <token>)
-        parts = auth_header.split()
-        if len(parts) != 2 or parts[0].lower() != "bearer":
-            logger.warning(f"令牌格式错误 | Invalid token format: {request.url.path}")
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Invalid authentication token format. Expected: Bearer <token>"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        token = parts[1]
-        
-        # 验证 Token
-        if token != Config.STATIC_TOKEN:
-            logger.warning(f"令牌验证失败 | Invalid token: {request.url.path}")
-            return JSONResponse(
-                status_code=401,
-                content={"detail": "Invalid authentication token"},
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Token 验证通过
-        logger.debug(f"认证通过 | Authenticated: {request.url.path}")
-        response = await call_next(request)
-        return response
-    
-    def _is_whitelisted(self, path: str) -> bool:
+            logger.warning(f"未提供认证令牌 | Missing token: {path}")
+            await self._reject(send, _MISSING_TOKEN_BODY)
+            return
+
+        # 快速路径：整个头与 "Bearer <token>" 做一次常量时间比较
+        if not hmac.compare_digest(auth_header, _EXPECTED_HEADER):
+            # 验证 Token 格式 (Bearer <token>)，scheme 不区分大小写
+            parts = auth_header.split()
+            if len(parts) != 2 or parts[0].lower() != b"bearer":
+                logger.warning(f"令牌格式错误 | Invalid token format: {path}")
+                await self._reject(send, _INVALID_FORMAT_BODY)
+                return
+
+            # 验证 Token
+            if not hmac.compare_digest(parts[1], _EXPECTED_TOKEN):
+                logger.warning(f"令牌验证失败 | Invalid token: {path}")
+                await self._reject(send, _INVALID_TOKEN_BODY)
+                return
+
+        # Token 验证通过（热路径，成功不记录日志）
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send: Send, body: bytes):
         """
-        检查路径是否在白名单中
-        
+        返回 401 响应
+
         Args:
-            path: 请求路径
-            
-        Returns:
-            是否在白名单中
+            send: ASGI 发送通道
+            body: 预编码的 JSON 响应体
         """
-        # 精确匹配白名单路径
-        return path in self.WHITELIST_PATHS
+        # 复制为新列表，外层中间件可能原地修改响应头
+        await send({
+            "type": "http.response.start",
+            "status": 401,
+            "headers": list(_UNAUTH_HEADERS[body]),
+        })
+        await send({"type": "http.response.body", "body": body})
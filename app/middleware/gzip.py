@@ -0,0 +1,41 @@
+"""
+GZip 压缩中间件
+只压缩 JSON 等文本响应，音频/图片及 Range 请求直接放行
+"""
+from typing import Tuple
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware:
+    """
+    按请求路径跳过压缩的 GZip 中间件
+
+    锁定的 Starlette 版本（uv.lock）的 GZipMiddleware 只排除 text/event-stream，
+    不会跳过 audio/*、image/* 和 206 部分内容：压缩后丢失 Content-Length，
+    Content-Range 仍是未压缩偏移，客户端拖动进度/断点续传会出错，图片再压缩也没有收益。
+    因此在请求阶段按路径前缀和 Range 头决定是否经过 GZipMiddleware，不依赖 Starlette 版本
+    """
+
+    def __init__(self, app: ASGIApp, skip_prefixes: Tuple[str, ...] = (), **gzip_options):
+        """
+        Args:
+            app: 下游 ASGI 应用
+            skip_prefixes: 不压缩的路径前缀（返回文件流的路由）
+            gzip_options: 传给 GZipMiddleware 的参数（minimum_size、compresslevel）
+        """
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+        # 带 Range 的请求可能返回 206，压缩后 Content-Range 与实际字节不一致
+        for name, _ in scope["headers"]:
+            if name == b"range":
+                await self.app(scope, receive, send)
+                return
+        await self.gzip(scope, receive, send)
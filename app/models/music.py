@@ -18,6 +18,7 @@ class Music(Base):
     bitrate = Column(Integer, default=0, comment="比特率(kbps)")
     file_format = Column(String(16), nullable=True, comment="文件格式(mp3/flac/wav等)")
     local_path = Column(String(500), nullable=True, comment="服务端本地文件路径(仅device_id=server时使用)")
+    mtime_ns = Column(BigInteger, nullable=True, comment="本地文件修改时间(纳秒)，重复扫描时与大小一起判断文件是否变化")
     waveform = Column(Text, nullable=True, comment="音频波形数据(JSON或其他格式)")
     cover_uuid = Column(CHAR(36), nullable=True, comment="封面图片UUID")
     lyric = Column(Text, nullable=True, comment="歌词")
@@ -26,9 +27,25 @@ class Music(Base):
     add_time = Column(DateTime, server_default=func.now(), comment="添加时间")
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
-    # 联合唯一索引: (md5, device_id)
     __table_args__ = (
+        # 联合唯一索引: (md5, device_id)
         Index('idx_md5_device', 'md5', 'device_id', unique=True),
+        # 常用排序: 最新添加 / 播放量（热门、冷门推荐）
+        Index('idx_add_time', 'add_time'),
+        Index('idx_play_count', 'play_count'),
+        # 按设备游标分页: WHERE device_id = ? AND (add_time, uuid) < ? ORDER BY add_time DESC, uuid DESC
+        Index('idx_device_add_time', 'device_id', 'add_time', 'uuid'),
+        # 按设备的热门/冷门: WHERE device_id = ? ORDER BY play_count，索引扫描后直接 LIMIT，无需 filesort
+        Index('idx_device_play_count', 'device_id', 'play_count'),
+        # 重复扫描按本地路径批量查询文件大小与修改时间
+        Index('idx_device_local_path', 'device_id', 'local_path'),
+        # 按封面反查歌曲（MySQL 不支持部分索引，NULL 值在二级索引中代价很小）
+        Index('idx_cover_uuid', 'cover_uuid'),
+        # 歌名/作者/专辑全文索引，ngram 分词以支持中文
+        Index('ft_name_author_album', 'name', 'author', 'album',
+              mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+        # 歌词全文索引（歌词搜索）
+        Index('ft_lyric', 'lyric', mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
     )
 
     def __repr__(self):
@@ -2,7 +2,7 @@
 定时任务数据库模型 / Scheduler Task Database Model
 """
 
-from sqlalchemy import Column, String, Text, Integer, Boolean, BigInteger
+from sqlalchemy import Column, String, Text, Integer, Boolean, BigInteger, Index
 from app.database import Base
 
 
@@ -58,6 +58,12 @@ class SchedulerTask(Base):
     
     # 备注 / Description
     description = Column(Text, nullable=True, comment="备注说明")
+    
+    # 联合索引: 调度器按 (enabled, next_run_at) 查询到期任务
+    # Composite index: scheduler looks up due tasks by (enabled, next_run_at)
+    __table_args__ = (
+        Index('ix_sched_enabled_nextrun', 'enabled', 'next_run_at'),
+    )
 
 
 class TaskQueue(Base):
@@ -0,0 +1,21 @@
+"""
+自定义响应类
+基于 orjson 的 JSON 响应，作为 FastAPI 默认响应类
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    使用 orjson 序列化的 JSON 响应
+    C 实现，直接输出 UTF-8 字节，datetime 等类型原生支持，比标准库 json 快数倍
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+__all__ = ["ORJSONResponse"]
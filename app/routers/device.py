@@ -39,13 +39,13 @@ def device_to_dict(device) -> Dict[str, Any]:
         "device_type": device.device_type,
         "platform": device.platform,
         "app_version": device.app_version,
-        "created_at": device.created_at.isoformat() if device.created_at else None,
-        "updated_at": device.updated_at.isoformat() if device.updated_at else None,
+        "created_at": device.created_at,  # datetime 由响应序列化为 ISO 格式
+        "updated_at": device.updated_at,
     }
 
 
 @router.post("/register", summary="注册设备")
-async def register_device(
+def register_device(
     request: DeviceRegisterRequest,
     db: Session = Depends(get_db)
 ):
@@ -59,7 +59,7 @@ async def register_device(
     - **app_version**: 客户端版本号
     """
     try:
-        device = device_service.register_device(db, request.dict())
+        device = device_service.register_device(db, request.model_dump(exclude_none=True))
         return {
             "code": 200,
             "message": "设备注册成功",
@@ -71,7 +71,7 @@ async def register_device(
 
 
 @router.get("/list", summary="获取设备列表")
-async def get_device_list(db: Session = Depends(get_db)):
+def get_device_list(db: Session = Depends(get_db)):
     """
     获取所有已注册设备列表
     """
@@ -82,7 +82,7 @@ async def get_device_list(db: Session = Depends(get_db)):
             "message": "success",
             "data": {
                 "total": len(devices),
-                "list": [device_to_dict(device) for device in devices]
+                "list": devices  # 服务层已返回字典行，时间字段由响应序列化为 ISO 格式
             }
         }
     except Exception as e:
@@ -91,7 +91,7 @@ async def get_device_list(db: Session = Depends(get_db)):
 
 
 @router.get("/{device_id}", summary="获取设备详情")
-async def get_device_detail(
+def get_device_detail(
     device_id: str,
     db: Session = Depends(get_db)
 ):
@@ -110,7 +110,7 @@ async def get_device_detail(
 
 
 @router.put("/{device_id}", summary="更新设备信息")
-async def update_device(
+def update_device(
     device_id: str,
     request: DeviceUpdateRequest,
     db: Session = Depends(get_db)
@@ -120,7 +120,7 @@ async def update_device(
     """
     try:
         # 过滤掉 None 值
-        update_data = {k: v for k, v in request.dict().items() if v is not None}
+        update_data = request.model_dump(exclude_none=True)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="没有提供需要更新的字段")
@@ -142,7 +142,7 @@ async def update_device(
 
 
 @router.delete("/{device_id}", summary="删除设备")
-async def delete_device(
+def delete_device(
     device_id: str,
     db: Session = Depends(get_db)
 ):
@@ -2,22 +2,194 @@
 音乐相关API路由
 提供音乐列表查询、搜索、播放、封面等接口
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
-from fastapi.responses import FileResponse
+import os
+import hashlib
+from email.utils import formatdate
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
-from pathlib import Path
-from urllib.parse import unquote
+from typing import AsyncIterator, Optional, Dict, Any, Tuple
+from urllib.parse import quote, unquote
 from pydantic import BaseModel
+import anyio
+import anyio.to_thread
 
 from app.config import Config
 from app.database import get_db
-from app.models.music import Music
 from app.services import music_service
+from app.core.play_counter import get_play_counter
+from app.utils.cover_index import (
+    cached_cover_path, cached_thumbnail_path, resolve_cover_path, resolve_thumbnail_path
+)
 from app.log import logger
+from app.responses import ORJSONResponse
 
 router = APIRouter(prefix="/music", tags=["music"])
 
+# 访问数据库的路由使用普通 def：SQLAlchemy 为同步调用，FastAPI 会将其放入线程池执行，
+# 不阻塞事件循环；只读封面索引的封面/缩略图路由保留 async def，索引未命中时的文件探测放入线程池
+# 列表/搜索等大响应直接返回 ORJSONResponse，跳过 FastAPI 对返回值逐字段的 jsonable_encoder 转换
+
+
+# 音频MIME类型映射
+_AUDIO_MIME = {
+    '.mp3': 'audio/mpeg',
+    '.flac': 'audio/flac',
+    '.wav': 'audio/wav',
+    '.m4a': 'audio/mp4',
+    '.aac': 'audio/aac',
+    '.ogg': 'audio/ogg',
+    '.wma': 'audio/x-ms-wma'
+}
+
+
+def _accel_redirect(root: str, location: str, file_path: str, media_type: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+    """
+    构建 X-Accel-Redirect 响应，由 Nginx 以 sendfile 下发文件（含 Range 处理）
+    
+    Args:
+        root: 文件所在根目录（对应 Nginx internal location 的 alias）
+        location: 内部 location 名称（music / cover / thumbnail）
+        file_path: 文件路径
+        media_type: MIME类型
+        headers: 额外响应头
+        
+    Returns:
+        未启用或文件不在根目录下时返回None，由调用方自行下发文件
+    """
+    prefix = Config.ACCEL_REDIRECT_PREFIX
+    if not prefix:
+        return None
+    try:
+        relative = os.path.relpath(file_path, root)
+    except ValueError:
+        # Windows 下文件与根目录不在同一盘符，无法计算相对路径，回退到进程内下发
+        return None
+    # 根目录之外（以 .. 开头）的文件不交给 Nginx
+    if relative.startswith(".."):
+        return None
+    headers = dict(headers or {})
+    headers["X-Accel-Redirect"] = f"{prefix}/{location}/{quote(relative.replace(os.sep, '/'))}"
+    return Response(media_type=media_type, headers=headers)
+
+
+# 音频流读取块大小
+_STREAM_CHUNK = Config.STREAM_CHUNK_SIZE
+
+# 提示内核顺序读取以加大预读（Windows 无此接口）
+_FADV_SEQUENTIAL = getattr(os, "POSIX_FADV_SEQUENTIAL", None)
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 请求头（仅支持单个字节范围）
+    
+    Args:
+        range_header: Range 头，如 "bytes=0-1023"、"bytes=1024-"、"bytes=-500"
+        file_size: 文件大小
+        
+    Returns:
+        (start, end) 闭区间；多段范围、起点大于终点或无法识别的格式返回None（按完整文件返回）
+        
+    Raises:
+        HTTPException: 起点超出文件大小时返回 416
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+        else:
+            # 后缀范围：最后 N 个字节
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise ValueError
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+    except ValueError:
+        return None
+    
+    # 起点大于终点的范围语法无效，按 RFC 9110 忽略 Range 返回完整文件
+    if start > end:
+        return None
+    if start >= file_size:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    return start, min(end, file_size - 1)
+
+
+async def _iter_file(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    """
+    按块异步读取文件区间
+    
+    Args:
+        path: 文件路径
+        start: 起始偏移
+        length: 读取字节数
+    """
+    async with await anyio.open_file(path, "rb") as f:
+        if _FADV_SEQUENTIAL is not None:
+            os.posix_fadvise(f.wrapped.fileno(), start, length, _FADV_SEQUENTIAL)
+        if start:
+            await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(_STREAM_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _content_disposition(filename: str) -> str:
+    """构建 Content-Disposition 头（非ASCII文件名按 RFC 5987 编码）"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+# 封面以 cover_uuid 命名，写入后不再修改（替换封面会生成新的 cover_uuid），客户端可长期缓存且无需再验证
+_COVER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 缩略图删除后可按当前尺寸重新生成，缓存一天
+_THUMBNAIL_CACHE_CONTROL = "public, max-age=86400"
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    return any(
+        tag == "*" or tag.removeprefix("W/") == opaque
+        for tag in (t.strip() for t in if_none_match.split(","))
+    )
+
+
+def _json_with_etag(request: Request, content: Dict[str, Any]) -> Response:
+    """
+    返回带弱 ETag 的 JSON 响应，客户端携带相同 If-None-Match 时返回 304（无响应体）
+    ETag 取响应体的哈希，多进程部署时各进程对相同数据给出相同 ETag
+
+    Args:
+        request: 请求对象
+        content: 响应内容
+    """
+    response = ORJSONResponse(content)
+    etag = f'W/"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return response
+
 
 # Pydantic 模型定义
 class MusicAddRequest(BaseModel):
@@ -39,7 +211,7 @@ class MusicAddRequest(BaseModel):
 
 
 @router.post("/add")
-async def add_music(
+def add_music(
     request: MusicAddRequest,
     db: Session = Depends(get_db)
 ):
@@ -56,7 +228,7 @@ async def add_music(
     注意：(md5, device_id) 必须唯一
     """
     try:
-        music = music_service.add_music_from_client(db, request.dict())
+        music = music_service.add_music_from_client(db, request.model_dump())
         
         return {
             "code": 200,
@@ -76,10 +248,13 @@ async def add_music(
 
 
 @router.get("/list")
-async def list_music(
+def list_music(
+    request: Request,
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
     device_id: Optional[str] = Query(None, description="设备ID（不传则返回所有设备的音乐）"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor），传入时忽略 page"),
+    skip_count: bool = Query(False, description="不计算总数（total 返回 null），只需逐页加载时可减少查询开销"),
     db: Session = Depends(get_db)
 ):
     """
@@ -92,6 +267,11 @@ async def list_music(
       - 不传：返回所有音乐
       - "server"：仅服务器音乐
       - 其他：指定设备的音乐
+    - **cursor**: 游标（可选），深翻页时推荐使用，不计算总数（total 为 null）
+    - **skip_count**: 不计算总数（可选），total 为 null
+    
+    按添加时间倒序返回，响应中的 next_cursor 为 null 表示没有更多数据
+    响应带 ETag，轮询时携带 If-None-Match 且数据未变化返回 304
     """
     try:
         # 使用新的服务层函数，支持设备过滤
@@ -99,54 +279,48 @@ async def list_music(
             db=db,
             device_id=device_id,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            skip_count=skip_count
         )
         
-        # 序列化为JSON
-        music_list = []
-        for music in result['list']:
-            music_dict = music_service.music_to_json(music)
-            # 添加播放URL
-            music_dict['play_url'] = f"/music/play/{music.uuid}"
-            # 添加封面和缩略图URL
-            cover_uuid = getattr(music, 'cover_uuid', None)
-            if cover_uuid:
-                music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-                music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-            else:
-                music_dict['cover_url'] = None
-                music_dict['thumbnail_url'] = None
-            # list接口不返回歌词
-            music_dict.pop('lyric', None)
-            music_list.append(music_dict)
+        # 服务层已返回字典行（不含歌词），只需补充URL
+        music_list = music_service.rows_to_cards(result['list'])
         
-        return {
+        return _json_with_etag(request, {
             "code": 200,
             "message": "success",
             "data": {
-                "total": result['total'],
-                "page": page,
+                "total": result.get('total'),
+                "page": None if cursor else page,
                 "page_size": page_size,
+                "next_cursor": result['next_cursor'],
                 "list": music_list
             }
-        }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"查询音乐列表失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/search")
-async def search_music(
+def search_music(
     keyword: str = Query(..., description="搜索关键词"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
     device_id: Optional[str] = Query(None, description="设备ID（不传则搜索所有设备）"),
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor），传入时忽略 page"),
+    skip_count: bool = Query(False, description="不计算总数（total 返回 null），只需逐页加载时可减少查询开销"),
     db: Session = Depends(get_db)
 ):
     """
     模糊搜索音乐
     支持按歌名、作者、专辑搜索（OR逻辑）
     支持按设备过滤
+    
+    按添加时间倒序返回；深翻页时传入上一页的 next_cursor 使用游标分页（不计算总数）
     """
     try:
         # 使用新的服务层函数，支持设备过滤
@@ -157,45 +331,38 @@ async def search_music(
             author=keyword,
             album=keyword,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            skip_count=skip_count,
+            cursor=cursor
         )
         
-        # 序列化结果
-        music_list = []
-        for music in result['list']:
-            music_dict = music_service.music_to_json(music)
-            music_dict['play_url'] = f"/music/play/{music.uuid}"
-            cover_uuid = getattr(music, 'cover_uuid', None)
-            if cover_uuid:
-                music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-                music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-            else:
-                music_dict['cover_url'] = None
-                music_dict['thumbnail_url'] = None
-            # search接口不返回歌词
-            music_dict.pop('lyric', None)
-            music_list.append(music_dict)
+        # 服务层已返回字典行（不含歌词），只需补充URL
+        music_list = music_service.rows_to_cards(result['list'])
         
-        return {
+        return ORJSONResponse({
             "code": 200,
             "message": "success",
             "data": {
-                "total": result['total'],
-                "page": page,
+                "total": result.get('total'),
+                "page": None if cursor else page,
                 "page_size": page_size,
+                "next_cursor": result['next_cursor'],
                 "list": music_list
             }
-        }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"搜索音乐失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/search/lyric")
-async def search_music_by_lyric(
+def search_music_by_lyric(
     keyword: str = Query(..., description="歌词关键词"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(10, ge=1, le=100, description="每页数量"),
+    skip_count: bool = Query(False, description="不计算总数（total 返回 null），只需逐页加载时可减少查询开销"),
     db: Session = Depends(get_db)
 ):
     """
@@ -208,25 +375,15 @@ async def search_music_by_lyric(
             db=db,
             lyric_keyword=keyword,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            skip_count=skip_count
         )
         
-        # 序列化结果
-        music_list = []
-        for music in result['list']:
-            music_dict = music_service.music_to_json(music)
-            music_dict['play_url'] = f"/music/play/{music.uuid}"
-            cover_uuid = getattr(music, 'cover_uuid', None)
-            if cover_uuid:
-                music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-                music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-            else:
-                music_dict['cover_url'] = None
-                music_dict['thumbnail_url'] = None
-            # 歌词搜索接口保留歌词（方便高亮显示匹配部分）
-            music_list.append(music_dict)
+        # 服务层已返回字典行，只需补充URL
+        # 歌词搜索接口保留歌词（方便高亮显示匹配部分）
+        music_list = music_service.rows_to_cards(result['list'])
         
-        return {
+        return ORJSONResponse({
             "code": 200,
             "message": "success",
             "data": {
@@ -236,14 +393,14 @@ async def search_music_by_lyric(
                 "keyword": keyword,
                 "list": music_list
             }
-        }
+        })
     except Exception as e:
         logger.error(f"根据歌词搜索音乐失败: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/detail/{uuid}")
-async def get_music_detail(
+def get_music_detail(
     uuid: str,
     db: Session = Depends(get_db)
 ):
@@ -251,19 +408,11 @@ async def get_music_detail(
     获取音乐详细信息
     """
     try:
-        music = music_service.get_music_by_uuid(db, uuid)
+        music = music_service.get_music_row(db, uuid)
         if not music:
             raise HTTPException(status_code=404, detail="Music not found")
         
-        music_dict = music_service.music_to_json(music)
-        music_dict['play_url'] = f"/music/play/{music.uuid}"
-        cover_uuid = getattr(music, 'cover_uuid', None)
-        if cover_uuid:
-            music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-            music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-        else:
-            music_dict['cover_url'] = None
-            music_dict['thumbnail_url'] = None
+        music_dict = music_service.attach_urls(music)
         
         return {
             "code": 200,
@@ -278,90 +427,97 @@ async def get_music_detail(
 
 
 @router.get("/play/{uuid}")
-async def play_music(
+def play_music(
     uuid: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     播放音乐（音频流）
     根据UUID从数据库查找音乐文件并返回流
+    支持 Range 请求（206 部分内容），便于客户端拖动进度
     
     工作流程：
     1. 服务端音乐（device_id="server"）：直接使用 local_path 播放
+       （旧数据缺少 local_path 时需先运行 backfill_local_path.py）
     2. 客户端音乐（其他 device_id）：
        - 客户端应优先检查本地映射表
        - 本地没有时，可以调用此接口从服务器获取（如果服务器有副本）
     """
     try:
-        # 从数据库获取音乐信息
-        music = music_service.get_music_by_uuid(db, uuid)
+        # 从数据库获取音乐信息（只查定位文件所需的列）
+        music = music_service.get_music_row(db, uuid, music_service.PLAY_COLUMNS)
         if not music:
             raise HTTPException(status_code=404, detail="Music not found")
         
-        file_path = None
-        
-        # 优先使用 local_path（适用于服务端音乐和有本地副本的客户端音乐）
-        local_path_value = getattr(music, 'local_path', None)
-        if local_path_value:
-            file_path = Path(local_path_value)
-            if not file_path.exists():
+        # 直接使用数据库中的 local_path，不再按文件名探测
+        # 旧数据缺少 local_path 时运行 backfill_local_path.py 回填
+        local_path_value = music['local_path']
+        file_path = local_path_value or None
+        stat = None
+        if file_path:
+            # stat 同时判断文件存在并取得大小
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
                 logger.warning(f"local_path 指向的文件不存在: {local_path_value}")
                 file_path = None
         
         # 如果没有找到文件
         if not file_path:
-            device_id = getattr(music, 'device_id', 'server')
+            device_id = music['device_id']
             if device_id == 'server':
-                # 服务端音乐但没有 local_path，尝试在 MUSIC_DIR 查找
-                music_dir = Path(Config.MUSIC_DIR)
-                
-                for ext in Config.MUSIC_EXTS:
-                    possible_names = [
-                        f"{music.name} - {music.author}{ext}",
-                        f"{music.name}-{music.author}{ext}",
-                        f"{music.author} - {music.name}{ext}",
-                    ]
-                    for name in possible_names:
-                        test_path = music_dir / name
-                        if test_path.exists():
-                            file_path = test_path
-                            break
-                    if file_path:
-                        break
-                
-                if not file_path:
-                    logger.error(f"服务端音乐文件未找到: {music.name} - {music.author} (UUID: {uuid})")
-                    raise HTTPException(status_code=404, detail="Music file not found on server")
-            else:
-                # 客户端音乐，服务器没有副本
-                logger.info(f"客户端音乐，服务器无副本: {music.name} (device_id: {device_id})")
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Music file not available on server (device_id: {device_id})"
-                )
-        
-        # 更新播放次数
-        current_count = getattr(music, 'play_count', 0)
-        setattr(music, 'play_count', current_count + 1)
-        db.commit()
+                logger.error(f"服务端音乐文件未找到: {music['name']} - {music['author']} (UUID: {uuid})")
+                raise HTTPException(status_code=404, detail="Music file not found on server")
+            # 客户端音乐，服务器没有副本
+            logger.info(f"客户端音乐，服务器无副本: {music['name']} (device_id: {device_id})")
+            raise HTTPException(
+                status_code=404,
+                detail=f"Music file not available on server (device_id: {device_id})"
+            )
+        
+        # 更新播放次数（内存累计，后台批量写回）
+        get_play_counter().increment(uuid)
         
         # 确定MIME类型
-        ext = file_path.suffix.lower()
-        mime_map = {
-            '.mp3': 'audio/mpeg',
-            '.flac': 'audio/flac',
-            '.wav': 'audio/wav',
-            '.m4a': 'audio/mp4',
-            '.aac': 'audio/aac',
-            '.ogg': 'audio/ogg',
-            '.wma': 'audio/x-ms-wma'
+        file_name = os.path.basename(file_path)
+        media_type = _AUDIO_MIME.get(os.path.splitext(file_name)[1].lower(), 'application/octet-stream')
+        
+        disposition = _content_disposition(file_name)
+        
+        # 配置了 Nginx 内部路径时交给 Nginx 下发（Range 也由 Nginx 处理）
+        accel = _accel_redirect(
+            Config.MUSIC_DIR, "music", local_path_value, media_type,
+            {"Content-Disposition": disposition}
+        )
+        if accel is not None:
+            return accel
+        
+        file_size = stat.st_size
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": disposition,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
         }
-        media_type = mime_map.get(ext, 'application/octet-stream')
         
-        return FileResponse(
-            path=str(file_path),
+        # 解析 Range，返回部分内容
+        range_header = request.headers.get("range")
+        byte_range = _parse_range(range_header, file_size) if range_header else None
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+            status_code = 206
+        else:
+            start, length = 0, file_size
+            status_code = 200
+        headers["Content-Length"] = str(length)
+        
+        return StreamingResponse(
+            _iter_file(file_path, start, length),
+            status_code=status_code,
             media_type=media_type,
-            filename=file_path.name
+            headers=headers
         )
         
     except HTTPException:
@@ -372,43 +528,36 @@ async def play_music(
 
 
 @router.get("/cover/{cover_uuid}")
-async def get_cover(cover_uuid: str):
+async def get_cover(cover_uuid: str, request: Request):
     """
     获取封面图片
     根据cover_uuid返回封面文件
+    ETag 由 cover_uuid 生成，If-None-Match 命中时直接返回 304，无需 stat 和打开文件
     """
     try:
         cover_uuid = unquote(cover_uuid)
         
-        # 在封面目录查找文件
-        cover_dir = Path(Config.COVER_DIR)
-        
-        # 尝试所有可能的扩展名
-        cover_path = None
-        for ext in Config.COVER_EXTS:
-            test_path = cover_dir / f"{cover_uuid}{ext}"
-            if test_path.exists():
-                cover_path = test_path
-                break
-        
-        if not cover_path or not cover_path.exists():
+        # 从封面索引解析路径（无需探测文件）；未登记时在线程池中按扩展名探测，不阻塞事件循环
+        resolved = cached_cover_path(cover_uuid)
+        if resolved is None:
+            resolved = await anyio.to_thread.run_sync(resolve_cover_path, cover_uuid)
+        if not resolved:
             raise HTTPException(status_code=404, detail="Cover not found")
         
-        # 确定MIME类型
-        ext = cover_path.suffix.lower()
-        mime_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.webp': 'image/webp',
-            '.bmp': 'image/bmp'
-        }
-        media_type = mime_map.get(ext, 'application/octet-stream')
+        headers = {"Cache-Control": _COVER_CACHE_CONTROL, "ETag": f'"{cover_uuid}"'}
+        if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        # 其余请求（含只带 If-Modified-Since 的）交给 FileResponse，按文件的 Last-Modified 返回完整内容
         
+        cover_path, media_type = resolved
+        accel = _accel_redirect(Config.COVER_DIR, "cover", cover_path, media_type, headers)
+        if accel is not None:
+            return accel
         return FileResponse(
-            path=str(cover_path),
+            path=cover_path,
             media_type=media_type,
-            filename=cover_path.name
+            filename=os.path.basename(cover_path),
+            headers=headers
         )
         
     except HTTPException:
@@ -419,7 +568,7 @@ async def get_cover(cover_uuid: str):
 
 
 @router.get("/lyric/{uuid}")
-async def get_lyric(
+def get_lyric(
     uuid: str,
     db: Session = Depends(get_db)
 ):
@@ -427,19 +576,15 @@ async def get_lyric(
     获取歌词
     """
     try:
-        music = music_service.get_music_by_uuid(db, uuid)
+        music = music_service.get_music_row(db, uuid, music_service.LYRIC_COLUMNS)
         if not music:
             raise HTTPException(status_code=404, detail="Music not found")
         
+        music["lyric"] = music["lyric"] or ""
         return {
             "code": 200,
             "message": "success",
-            "data": {
-                "uuid": music.uuid,
-                "name": music.name,
-                "author": music.author,
-                "lyric": music.lyric or ""
-            }
+            "data": music
         }
     except HTTPException:
         raise
@@ -455,20 +600,24 @@ async def get_thumbnail(cover_uuid: str):
     根据cover_uuid返回缩略图文件（小体积JPEG格式）
     """
     try:
-        from urllib.parse import unquote
         cover_uuid = unquote(cover_uuid)
         
-        # 在缩略图目录查找文件（统一为.jpg格式）
-        thumbnail_dir = Path(Config.THUMBNAIL_DIR)
-        thumbnail_path = thumbnail_dir / f"{cover_uuid}.jpg"
-        
-        if not thumbnail_path.exists():
+        # 从封面索引解析缩略图路径（无需探测文件）；未登记时在线程池中探测
+        thumbnail_path = cached_thumbnail_path(cover_uuid)
+        if thumbnail_path is None:
+            thumbnail_path = await anyio.to_thread.run_sync(resolve_thumbnail_path, cover_uuid)
+        if not thumbnail_path:
             raise HTTPException(status_code=404, detail="Thumbnail not found")
         
+        headers = {"Cache-Control": _THUMBNAIL_CACHE_CONTROL}
+        accel = _accel_redirect(Config.THUMBNAIL_DIR, "thumbnail", thumbnail_path, 'image/jpeg', headers)
+        if accel is not None:
+            return accel
         return FileResponse(
-            path=str(thumbnail_path),
+            path=thumbnail_path,
             media_type='image/jpeg',
-            filename=thumbnail_path.name
+            filename=os.path.basename(thumbnail_path),
+            headers=headers
         )
         
     except HTTPException:
@@ -479,7 +628,7 @@ async def get_thumbnail(cover_uuid: str):
 
 
 @router.delete("/{uuid}")
-async def delete_music(
+def delete_music(
     uuid: str,
     device_id: str = Query(..., description="设备ID（用于权限验证）"),
     db: Session = Depends(get_db)
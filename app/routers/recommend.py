@@ -7,7 +7,6 @@ from fastapi import Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services import recommend_service, music_service
-from app.config import Config
 from app.log import logger
 
 router = APIRouter(prefix="/recommend", tags=["recommend"])
@@ -22,22 +21,8 @@ def recommend_hot_music(
     """
     try:
         musics = recommend_service.get_hot_recommendations(db, pick=pick)
-        music_list = []
-        for music in musics:
-            music_dict = music_service.music_to_json(music)
-            # 添加播放URL
-            music_dict['play_url'] = f"/music/play/{music.uuid}"
-            # 添加封面和缩略图URL
-            cover_uuid = getattr(music, 'cover_uuid', None)
-            if cover_uuid:
-                music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-                music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-            else:
-                music_dict['cover_url'] = None
-                music_dict['thumbnail_url'] = None
-            # 推荐接口不返回歌词
-            music_dict.pop('lyric', None)
-            music_list.append(music_dict)
+        # 服务层已返回字典行（不含歌词），只需补充URL
+        music_list = music_service.rows_to_cards(musics)
         return {
             "code": 200,
             "message": "success",
@@ -60,19 +45,8 @@ def recommend_cold_music(
     """
     try:
         musics = recommend_service.get_cold_recommendations(db, pick=pick)
-        music_list = []
-        for music in musics:
-            music_dict = music_service.music_to_json(music)
-            music_dict['play_url'] = f"/music/play/{music.uuid}"
-            cover_uuid = getattr(music, 'cover_uuid', None)
-            if cover_uuid:
-                music_dict['cover_url'] = f"/music/cover/{cover_uuid}"
-                music_dict['thumbnail_url'] = f"/music/thumbnail/{cover_uuid}"
-            else:
-                music_dict['cover_url'] = None
-                music_dict['thumbnail_url'] = None
-            music_dict.pop('lyric', None)
-            music_list.append(music_dict)
+        # 服务层已返回字典行（不含歌词），只需补充URL
+        music_list = music_service.rows_to_cards(musics)
         return {
             "code": 200,
             "message": "success",
@@ -2,10 +2,10 @@
 设备服务层
 处理设备相关的业务逻辑
 """
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.device import Device
 from app.log import logger
-from datetime import datetime
 
 
 def register_device(db: Session, device_data: dict) -> Device:
@@ -46,7 +46,7 @@ def register_device(db: Session, device_data: dict) -> Device:
     return device
 
 
-def get_device_list(db: Session) -> list[Device]:
+def get_device_list(db: Session) -> list[dict]:
     """
     获取所有设备列表
     
@@ -54,10 +54,10 @@ def get_device_list(db: Session) -> list[Device]:
         db: 数据库会话
     
     Returns:
-        list[Device]: 设备列表
+        list[dict]: 设备字典列表（按列直接查询，不构建 ORM 对象）
     """
-    devices = db.query(Device).order_by(Device.created_at.desc()).all()
-    return devices
+    stmt = select(*Device.__table__.columns).order_by(Device.created_at.desc())
+    return [dict(row) for row in db.execute(stmt).mappings()]
 
 
 def get_device_by_id(db: Session, device_id: str) -> Device | None:
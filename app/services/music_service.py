@@ -1,40 +1,77 @@
 """
 Music表相关服务
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from app.models.music import Music
-from typing import List, Optional, Dict, Any
-from sqlalchemy import or_, and_
-from sqlalchemy.exc import SQLAlchemyError
-from uuid import uuid4
-import json
-
-# 自动建表（如未开启）
-from app.database import engine, Base
-Base.metadata.create_all(bind=engine)
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+from sqlalchemy import or_, and_, func, select, bindparam, insert, delete, case, literal, tuple_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import IntegrityError
+from pathlib import Path
+from collections import OrderedDict
+from collections.abc import Mapping
+import threading
+import time
+from datetime import datetime
+import base64
+import unicodedata
+from operator import attrgetter
+from itertools import islice
+
+from app.config import Config
+from app.utils.uuid7 import uuid7
 
 # 单个插入
 
 def add_music(db: Session, music_data: Dict[str, Any]) -> Music:
     # 若未传uuid则自动生成
     if not music_data.get("uuid"):
-        music_data["uuid"] = str(uuid4())
+        music_data["uuid"] = str(uuid7())
     music = Music(**music_data)
     db.add(music)
     db.commit()
+    invalidate_count_cache()
     db.refresh(music)
     return music
 
 # 批量插入
 
-def add_musics(db: Session, musics_data: List[Dict[str, Any]]) -> List[Music]:
-    for data in musics_data:
-        if not data.get("uuid"):
-            data["uuid"] = str(uuid4())
-    musics = [Music(**data) for data in musics_data]
-    db.add_all(musics)
+# 批量插入每批的行数，大批量导入时内存占用与批大小而非总数成正比
+_INSERT_BATCH_SIZE = 1000
+
+def add_musics(db: Session, musics_data: Iterable[Dict[str, Any]], skip_duplicates: bool = False) -> List[str]:
+    """
+    批量插入音乐，每批一条 INSERT 以 executemany 执行，不构建 ORM 对象
+    
+    接受任意可迭代对象（如生成器），按 _INSERT_BATCH_SIZE 分批写入，全部写入后统一提交
+    
+    Args:
+        db: 数据库会话
+        musics_data: 音乐数据（列表或生成器），未传uuid时自动生成
+        skip_duplicates: 是否跳过 (md5, device_id) 已存在的记录（INSERT IGNORE），否则重复时抛出异常
+    
+    Returns:
+        List[str]: 音乐UUID列表（跳过的重复记录也包含在内）
+    """
+    stmt = insert(Music)
+    if skip_duplicates:
+        stmt = stmt.prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+    uuids = []
+    it = iter(musics_data)
+    while True:
+        batch = list(islice(it, _INSERT_BATCH_SIZE))
+        if not batch:
+            break
+        for data in batch:
+            if not data.get("uuid"):
+                data["uuid"] = str(uuid7())
+            uuids.append(data["uuid"])
+        db.execute(stmt, batch)
+    if not uuids:
+        return []
     db.commit()
-    return musics
+    invalidate_count_cache()
+    return uuids
 
 # 单个修改
 
@@ -45,76 +82,242 @@ def update_music(db: Session, uuid: str, update_data: Dict[str, Any]) -> Optiona
     for k, v in update_data.items():
         setattr(music, k, v)
     db.commit()
+    invalidate_music_cache(uuid)
+    invalidate_count_cache()
     db.refresh(music)
     return music
 
 # 批量修改（根据uuid列表）
 
+# 单条 CASE UPDATE 最多覆盖的行数，限制语句长度
+_UPDATE_BATCH_SIZE = 500
+
 def update_musics(db: Session, updates: List[Dict[str, Any]]) -> int:
-    count = 0
+    """
+    批量修改音乐，不逐行 SELECT
+    
+    按修改的字段集合分组，每组每 _UPDATE_BATCH_SIZE 行一条
+    UPDATE ... SET col = CASE uuid WHEN ? THEN ? ... END WHERE uuid IN (...)；
+    MySQL 驱动的 executemany 只对 INSERT 合并，UPDATE 仍逐行往返，CASE 写法一次往返完成一批
+    不存在的 uuid 不会报错，只是不计入修改数量
+    
+    Returns:
+        int: 实际匹配到的行数
+    """
+    groups: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
     for upd in updates:
         uuid = upd.get("uuid")
         if not uuid:
             continue
-        music = db.query(Music).filter(Music.uuid == uuid).first()
-        if not music:
+        values = {k: v for k, v in upd.items() if k != "uuid"}
+        if not values:
             continue
-        for k, v in upd.items():
-            if k != "uuid":
-                setattr(music, k, v)
-        count += 1
+        # 同一 uuid 在同一组内重复出现时以最后一次为准
+        groups.setdefault(tuple(sorted(values)), {})[uuid] = values
+    
+    table = Music.__table__
+    count = 0
+    for keys, rows in groups.items():
+        uuids = list(rows)
+        for i in range(0, len(uuids), _UPDATE_BATCH_SIZE):
+            batch = uuids[i:i + _UPDATE_BATCH_SIZE]
+            stmt = (
+                table.update()
+                .where(table.c.uuid.in_(batch))
+                .values({
+                    k: case({u: rows[u][k] for u in batch}, value=table.c.uuid)
+                    for k in keys
+                })
+            )
+            count += db.execute(stmt).rowcount
     db.commit()
+    invalidate_music_cache(*(u for rows in groups.values() for u in rows))
+    invalidate_count_cache()
     return count
 
 # 根据uuid判断是否存在
 
+# 只按主键判断是否存在，返回常量 1，不读取任何列
+_EXISTS_STMT = select(literal(1)).where(Music.uuid == bindparam("uuid")).limit(1)
+
 def music_exists(db: Session, uuid: str) -> bool:
-    return db.query(Music).filter(Music.uuid == uuid).first() is not None
+    return db.execute(_EXISTS_STMT, {"uuid": uuid}).first() is not None
 
 # 根据uuid获取
 
 def get_music_by_uuid(db: Session, uuid: str) -> Optional[Music]:
     return db.query(Music).filter(Music.uuid == uuid).first()
 
+# 单行查询缓存：uuid -> (过期时间, {列集合: 字典行})
+# 播放/详情/歌词接口对同一首歌的重复请求不再查库；写操作调用 invalidate_music_cache 失效，
+# 多进程部署时其他进程的缓存最多滞后 _ROW_CACHE_TTL 秒
+_ROW_CACHE_SIZE = 4096
+_ROW_CACHE_TTL = 60
+_row_cache: "OrderedDict[str, Tuple[float, Dict[Any, Dict[str, Any]]]]" = OrderedDict()
+_row_cache_lock = threading.Lock()
+# 失效次数：查询前记下，写入缓存时若已变化说明查询期间发生过失效，结果可能是旧数据，不写入
+_row_cache_generation = 0
+
+# 按列集合预先构建的单行查询语句（uuid 以绑定参数传入），缓存未命中时不再每次构建表达式
+_row_stmts: Dict[Any, Any] = {}
+
+def invalidate_music_cache(*uuids: str):
+    """使指定音乐的单行查询缓存失效（未传 uuid 时不做任何事，清空全部用 clear_music_cache）"""
+    global _row_cache_generation
+    if not uuids:
+        return
+    with _row_cache_lock:
+        _row_cache_generation += 1
+        for uuid in uuids:
+            _row_cache.pop(uuid, None)
+
+def clear_music_cache():
+    """清空全部单行查询缓存"""
+    global _row_cache_generation
+    with _row_cache_lock:
+        _row_cache_generation += 1
+        _row_cache.clear()
+
+# 根据uuid获取字典行（只读接口使用，不构建 ORM 对象）
+
+def get_music_row(db: Session, uuid: str, columns: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+    """
+    根据uuid查询音乐，直接返回字典行（带缓存）
+    
+    Args:
+        db: 数据库会话
+        uuid: 音乐UUID
+        columns: 要查询的列，默认全部列
+    
+    Returns:
+        音乐字典（副本，可直接修改），不存在返回None
+    """
+    now = time.monotonic()
+    with _row_cache_lock:
+        entry = _row_cache.get(uuid)
+        if entry is not None and entry[0] > now:
+            row = entry[1].get(columns)
+            if row is not None:
+                _row_cache.move_to_end(uuid)
+                return dict(row)
+        generation = _row_cache_generation
+    
+    stmt = _row_stmts.get(columns)
+    if stmt is None:
+        stmt = _row_stmts.setdefault(
+            columns,
+            select(*(columns or Music.__table__.columns)).where(Music.uuid == bindparam("uuid"))
+        )
+    row = db.execute(stmt, {"uuid": uuid}).mappings().first()
+    if row is None:
+        # 不存在的不缓存，之后新增的音乐立即可见
+        return None
+    row = dict(row)
+    
+    with _row_cache_lock:
+        if generation != _row_cache_generation:
+            return row
+        entry = _row_cache.get(uuid)
+        if entry is None or entry[0] <= now:
+            entry = (now + _ROW_CACHE_TTL, {})
+            _row_cache[uuid] = entry
+        entry[1][columns] = row
+        _row_cache.move_to_end(uuid)
+        if len(_row_cache) > _ROW_CACHE_SIZE:
+            _row_cache.popitem(last=False)
+    return dict(row)
+
 # 支持分页的多条件精确查询
 
 def query_music(db: Session, name: Optional[str] = None, author: Optional[str] = None, album: Optional[str] = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
-    q = db.query(Music)
+    """返回 {'total': 总数, 'list': 音乐字典列表（不含歌词）}，不构建 ORM 对象"""
+    stmt = select(*LIST_COLUMNS)
     if name:
-        q = q.filter(Music.name == name)
+        stmt = stmt.where(Music.name == name)
     if author:
-        q = q.filter(Music.author == author)
+        stmt = stmt.where(Music.author == author)
     if album:
-        q = q.filter(Music.album == album)
-    total = q.count()
-    items = q.offset((page-1)*page_size).limit(page_size).all()
-    return {"total": total, "list": items}
+        stmt = stmt.where(Music.album == album)
+    return _paginate_rows(db, stmt, page, page_size, ("exact", name, author, album))
 
-# 支持分页的多条件模糊查询
+# MySQL ngram 全文解析器的默认分词长度（ngram_token_size）
+_NGRAM_TOKEN_SIZE = 2
 
-def fuzzy_query_music(db: Session, name: Optional[str] = None, author: Optional[str] = None, album: Optional[str] = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
-    q = db.query(Music)
+# 全文索引短语匹配
+
+def _fulltext_phrase(db: Session, columns: tuple, keyword: Optional[str]):
+    """
+    在 MySQL 上构建全文索引短语匹配条件
+    
+    关键词短于 ngram 分词长度或非 MySQL 时返回 None，由调用方回退到 LIKE
     
-    # 构建 OR 条件列表
+    Returns:
+        MATCH ... AGAINST 条件表达式，或 None
+    """
+    if (
+        not keyword
+        or len(keyword) < _NGRAM_TOKEN_SIZE
+        or db.get_bind().dialect.name != "mysql"
+    ):
+        return None
+    # 布尔模式下用双引号做短语匹配，效果接近子串匹配
+    phrase = keyword.replace('"', ' ')
+    return match(*columns, against=f'"{phrase}"').in_boolean_mode()
+
+# 搜索关键词最大长度，限制超长关键词带来的匹配开销
+_MAX_KEYWORD_LENGTH = 64
+
+def _normalize_keyword(keyword: Optional[str]) -> Optional[str]:
+    """去除首尾空白并截断关键词，空关键词返回 None"""
+    if not keyword:
+        return None
+    keyword = keyword.strip()[:_MAX_KEYWORD_LENGTH]
+    return keyword or None
+
+# 歌名/作者/专辑关键词条件
+
+def _text_search_condition(db: Session, name: Optional[str], author: Optional[str], album: Optional[str]):
+    """
+    构建歌名/作者/专辑的 OR 搜索条件
+    
+    三个字段使用同一关键词时（搜索接口），在 MySQL 上改用全文索引短语匹配，
+    避免三个 LIKE '%kw%' 全表扫描；关键词短于 ngram 分词长度或非 MySQL 时回退到 LIKE
+    
+    Returns:
+        条件表达式，无关键词时返回None
+    """
+    if name and name == author == album:
+        condition = _fulltext_phrase(db, (Music.name, Music.author, Music.album), name)
+        if condition is not None:
+            return condition
+    
+    # 关键词中的 % 和 _ 按字面匹配，避免用户输入变成通配符
     conditions = []
     if name:
-        conditions.append(Music.name.like(f"%{name}%"))
+        conditions.append(Music.name.contains(name, autoescape=True))
     if author:
-        conditions.append(Music.author.like(f"%{author}%"))
+        conditions.append(Music.author.contains(author, autoescape=True))
     if album:
-        conditions.append(Music.album.like(f"%{album}%"))
+        conditions.append(Music.album.contains(album, autoescape=True))
+    return or_(*conditions) if conditions else None
+
+# 支持分页的多条件模糊查询
+
+def fuzzy_query_music(db: Session, name: Optional[str] = None, author: Optional[str] = None, album: Optional[str] = None, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+    """返回 {'total': 总数, 'list': 音乐字典列表（不含歌词）}，不构建 ORM 对象"""
+    name, author, album = _normalize_keyword(name), _normalize_keyword(author), _normalize_keyword(album)
+    stmt = select(*LIST_COLUMNS)
     
-    # 如果有条件，使用 or_ 组合
-    if conditions:
-        q = q.filter(or_(*conditions))
+    # 构建 OR 条件（MySQL 上走全文索引）
+    condition = _text_search_condition(db, name, author, album)
+    if condition is not None:
+        stmt = stmt.where(condition)
     
-    total = q.count()
-    items = q.offset((page-1)*page_size).limit(page_size).all()
-    return {"total": total, "list": items}
+    return _paginate_rows(db, stmt, page, page_size, ("fuzzy", None, name, author, album))
 
 # 根据歌词搜索音乐
 
-def search_music_by_lyric(db: Session, lyric_keyword: str, page: int = 1, page_size: int = 10) -> Dict[str, Any]:
+def search_music_by_lyric(db: Session, lyric_keyword: str, page: int = 1, page_size: int = 10, skip_count: bool = False) -> Dict[str, Any]:
     """
     根据歌词内容搜索音乐
     
@@ -123,37 +326,352 @@ def search_music_by_lyric(db: Session, lyric_keyword: str, page: int = 1, page_s
         lyric_keyword: 歌词关键词
         page: 页码
         page_size: 每页数量
+        skip_count: 不计算总数（total 为 None）
         
     Returns:
-        dict: {'total': 总数, 'list': 音乐列表}
+        dict: {'total': 总数, 'list': 音乐字典列表（含歌词）}
     """
-    q = db.query(Music)
+    stmt = select(*Music.__table__.columns)
     
-    # 只搜索有歌词的音乐
-    q = q.filter(Music.lyric.isnot(None))
-    q = q.filter(Music.lyric != "")
-    q = q.filter(Music.lyric.like(f"%{lyric_keyword}%"))
+    # MySQL 上走歌词全文索引，否则回退到 LIKE（关键词中的 % 和 _ 按字面匹配）
+    # 两者都不会匹配 NULL 或空歌词，无需额外过滤
+    condition = _fulltext_phrase(db, (Music.lyric,), lyric_keyword)
+    if condition is None:
+        condition = Music.lyric.contains(lyric_keyword, autoescape=True)
+    stmt = stmt.where(condition)
     
-    total = q.count()
-    items = q.offset((page-1)*page_size).limit(page_size).all()
-    return {"total": total, "list": items}
+    return _paginate_rows(db, stmt, page, page_size, ("lyric", lyric_keyword), skip_count)
 
 # 批量删除
 
+# 单条 DELETE 的 IN 列表最大长度，限制语句长度与绑定参数个数
+_DELETE_BATCH_SIZE = 900
+
 def delete_musics(db: Session, uuids: List[str]) -> int:
-    count = db.query(Music).filter(Music.uuid.in_(uuids)).delete(synchronize_session=False)
+    """按主键批量删除（Core DELETE，每批一条语句，统一提交），返回删除行数"""
+    count = 0
+    for i in range(0, len(uuids), _DELETE_BATCH_SIZE):
+        batch = uuids[i:i + _DELETE_BATCH_SIZE]
+        count += db.execute(delete(Music).where(Music.uuid.in_(batch))).rowcount
     db.commit()
+    invalidate_music_cache(*uuids)
+    invalidate_count_cache()
     return count
 
+def get_local_file_signatures(db: Session, local_paths: List[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    按本地路径批量查询服务端音乐记录的 (文件大小, 修改时间纳秒)
+    扫描时据此跳过未变化的文件；未记录修改时间的旧数据不返回
+    IN 列表与批量删除一样每批不超过 _DELETE_BATCH_SIZE 个参数
+    """
+    signatures = {}
+    for i in range(0, len(local_paths), _DELETE_BATCH_SIZE):
+        rows = db.execute(
+            select(Music.local_path, Music.size, Music.mtime_ns).where(
+                Music.device_id == "server",
+                Music.local_path.in_(local_paths[i:i + _DELETE_BATCH_SIZE]),
+                Music.mtime_ns.is_not(None),
+            )
+        ).all()
+        signatures.update((row.local_path, (row.size, row.mtime_ns)) for row in rows)
+    return signatures
+
+def get_server_musics_by_md5(db: Session, md5s: Iterable[str]) -> Dict[str, Music]:
+    """按 MD5 批量查询服务端音乐（ORM 对象），返回 md5 -> Music，扫描导入时一批文件一次查询"""
+    md5s = list(set(md5s))
+    result = {}
+    for i in range(0, len(md5s), _DELETE_BATCH_SIZE):
+        for music in db.query(Music).filter(
+            Music.md5.in_(md5s[i:i + _DELETE_BATCH_SIZE]),
+            Music.device_id == "server"
+        ):
+            result[music.md5] = music
+    return result
+
+def _fold(text: str) -> str:
+    """近似 MySQL _ci 排序规则的比较形式：去掉重音、忽略大小写及末尾空格"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().rstrip()
+
+def name_author_key(name: str, author: str) -> Tuple[str, str]:
+    """(歌名, 作者) 判重键，与数据库按 _ci 排序规则的匹配结果一致"""
+    return _fold(name), _fold(author)
+
+def get_musics_by_name_author(db: Session, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], Music]:
+    """
+    按 (歌名, 作者) 批量查询音乐（不限设备，ORM 对象），同名同作者有多条时取其一
+
+    数据库按 _ci 排序规则匹配，会返回大小写/末尾空格/重音不同的记录，
+    因此结果以 name_author_key 为键，调用方用同一函数生成查找键
+    """
+    pairs = list(set(pairs))
+    result = {}
+    for i in range(0, len(pairs), _DELETE_BATCH_SIZE):
+        for music in db.query(Music).filter(
+            tuple_(Music.name, Music.author).in_(pairs[i:i + _DELETE_BATCH_SIZE])
+        ):
+            result.setdefault(name_author_key(music.name, music.author), music)
+    return result
+
+# 列表接口查询的列（不含歌词大字段及扫描内部使用的修改时间）
+LIST_COLUMNS = tuple(c for c in Music.__table__.columns if c.name not in ("lyric", "mtime_ns"))
+
+# 播放接口只需定位文件及记录日志的列
+PLAY_COLUMNS = (Music.uuid, Music.name, Music.author, Music.device_id, Music.local_path)
+
+# 歌词接口返回的列
+LYRIC_COLUMNS = (Music.uuid, Music.name, Music.author, Music.lyric)
+
+# 分页总数缓存：(查询类型, 过滤条件...) -> (过期时间, 总数)
+# 同一过滤条件连续翻页时只在第一页计算总数；增删改后清空，多进程部署时其他进程最多滞后 _COUNT_CACHE_TTL 秒
+_COUNT_CACHE_SIZE = 1024
+_COUNT_CACHE_TTL = 30
+_count_cache: "OrderedDict[tuple, Tuple[float, int]]" = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+def invalidate_count_cache():
+    """清空分页总数缓存及列表页缓存（音乐增删改后调用）"""
+    with _count_cache_lock:
+        _count_cache.clear()
+    with _list_cache_lock:
+        _list_cache.clear()
+
+def _cached_count(count_key: tuple) -> Optional[int]:
+    """读取未过期的缓存总数，没有时返回None"""
+    with _count_cache_lock:
+        entry = _count_cache.get(count_key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        _count_cache.move_to_end(count_key)
+        return entry[1]
+
+def _store_count(count_key: tuple, total: int):
+    """写入总数缓存，超出容量时淘汰最久未用的条目"""
+    with _count_cache_lock:
+        _count_cache[count_key] = (time.monotonic() + _COUNT_CACHE_TTL, total)
+        _count_cache.move_to_end(count_key)
+        if len(_count_cache) > _COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
+# 列表页缓存：(设备ID, 页码, 每页数量, 游标, 是否跳过总数) -> (过期时间, 查询结果)
+# 客户端轮询/反复打开首页时不再查库；增删改时随总数缓存一起清空，
+# 播放次数等由后台写回的字段最多滞后 _LIST_CACHE_TTL 秒
+_LIST_CACHE_SIZE = 256
+_LIST_CACHE_TTL = 10
+_list_cache: "OrderedDict[tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_list_cache_lock = threading.Lock()
+
+def _copy_page(result: Dict[str, Any]) -> Dict[str, Any]:
+    """复制查询结果及其中的字典行（路由会原地补充URL）"""
+    page = dict(result)
+    page["list"] = [dict(row) for row in result["list"]]
+    return page
+
+def _cached_page(list_key: tuple) -> Optional[Dict[str, Any]]:
+    """读取未过期的列表页缓存（副本），没有时返回None"""
+    with _list_cache_lock:
+        entry = _list_cache.get(list_key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        _list_cache.move_to_end(list_key)
+        result = entry[1]
+    return _copy_page(result)
+
+def _store_page(list_key: tuple, result: Dict[str, Any]):
+    """写入列表页缓存（保存副本），超出容量时淘汰最久未用的条目"""
+    result = _copy_page(result)
+    with _list_cache_lock:
+        _list_cache[list_key] = (time.monotonic() + _LIST_CACHE_TTL, result)
+        _list_cache.move_to_end(list_key)
+        if len(_list_cache) > _LIST_CACHE_SIZE:
+            _list_cache.popitem(last=False)
+
+# 单条语句分页查询（COUNT(*) OVER() 同时返回总数）
+
+def _paginate_rows(
+    db: Session,
+    stmt,
+    page: int,
+    page_size: int,
+    count_key: Optional[tuple] = None,
+    skip_count: bool = False
+) -> Dict[str, Any]:
+    """
+    按列分页查询并通过窗口函数一并取回总数，省去单独的 COUNT 查询
+    直接返回字典行，不构建 ORM 对象
+    
+    窗口函数仍需统计全部匹配行；总数已缓存或调用方不需要总数时只执行 LIMIT 查询
+    
+    Args:
+        db: 数据库会话
+        stmt: 已添加过滤条件的 select(列...) 语句
+        page: 页码
+        page_size: 每页数量
+        count_key: 总数缓存键（过滤条件），None 表示不缓存
+        skip_count: 不计算总数（total 为 None）
+    
+    Returns:
+        dict: {'total': 总数, 'list': 音乐字典列表}
+    """
+    page_stmt = stmt.offset((page-1)*page_size).limit(page_size)
+    total = None if skip_count or count_key is None else _cached_count(count_key)
+    if skip_count or total is not None:
+        rows = db.execute(page_stmt).mappings().all()
+        return {"total": total, "list": [dict(row) for row in rows]}
+    
+    rows = db.execute(
+        page_stmt.add_columns(func.count().over().label("total"))
+    ).mappings().all()
+    if rows:
+        items = [dict(row) for row in rows]
+        total = items[0]["total"]
+        for item in items:
+            del item["total"]
+    else:
+        # 超出末页时窗口函数没有行可返回，回退到 COUNT 获取总数
+        items = []
+        total = db.scalar(select(func.count()).select_from(stmt.subquery())) if page > 1 else 0
+    if count_key is not None:
+        _store_count(count_key, total)
+    return {"total": total, "list": items}
+
+# 游标分页（keyset）：按 (add_time, uuid) 倒序，游标为上一页最后一行的排序键
+
+def encode_cursor(add_time: datetime, uuid: str) -> str:
+    """将排序键编码为不透明游标"""
+    raw = f"{add_time.isoformat()}|{uuid}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """
+    解码游标
+    
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        add_time, uuid = raw.split("|", 1)
+        return datetime.fromisoformat(add_time), uuid
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的游标: {cursor}") from e
+
+def _paginate_with_cursor(
+    db: Session,
+    stmt,
+    page: int,
+    page_size: int,
+    count_key: Optional[tuple] = None,
+    skip_count: bool = False
+) -> Dict[str, Any]:
+    """
+    按 (add_time, uuid) 倒序做页码分页，并返回可切换到游标翻页的 next_cursor
+    客户端可从任意页改用游标继续翻页，深翻页不再有 OFFSET 扫描
+    
+    Returns:
+        dict: {'total': 总数, 'list': 音乐字典列表, 'next_cursor': 下一页游标}
+    """
+    result = _paginate_rows(
+        db, stmt.order_by(Music.add_time.desc(), Music.uuid.desc()), page, page_size,
+        count_key, skip_count
+    )
+    # 不计算总数时以是否取满一页判断是否还有下一页
+    items = result["list"]
+    total = result["total"]
+    has_more = len(items) == page_size if total is None else page * page_size < total
+    result["next_cursor"] = (
+        encode_cursor(items[-1]["add_time"], items[-1]["uuid"])
+        if items and has_more else None
+    )
+    return result
+
+def _keyset_rows(db: Session, stmt, cursor: Optional[str], page_size: int) -> Dict[str, Any]:
+    """
+    游标分页查询：WHERE (add_time, uuid) < 游标 ORDER BY add_time DESC, uuid DESC LIMIT page_size+1
+    不做 COUNT，也没有 OFFSET 扫描，翻页代价与页深无关
+    
+    Args:
+        db: 数据库会话
+        stmt: 已添加过滤条件的 select(列...) 语句，需包含 add_time 和 uuid 列
+        cursor: 上一页返回的 next_cursor，None 表示第一页
+        page_size: 每页数量
+    
+    Returns:
+        dict: {'list': 音乐字典列表, 'next_cursor': 下一页游标，没有更多时为None}
+    """
+    if cursor:
+        last_time, last_uuid = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Music.add_time < last_time,
+            and_(Music.add_time == last_time, Music.uuid < last_uuid)
+        ))
+    rows = db.execute(
+        stmt.order_by(Music.add_time.desc(), Music.uuid.desc()).limit(page_size + 1)
+    ).mappings().all()
+    
+    # 多取一行用于判断是否还有下一页
+    items = [dict(row) for row in rows[:page_size]]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = items[-1]
+        next_cursor = encode_cursor(last["add_time"], last["uuid"])
+    return {"list": items, "next_cursor": next_cursor}
+
 # 序列化为json
 
+# 列名和对应的取值器在导入时算好，序列化时不再遍历 __table__.columns
+_MUSIC_COLUMN_NAMES = tuple(c.name for c in Music.__table__.columns)
+_get_music_values = attrgetter(*_MUSIC_COLUMN_NAMES)
+
 def music_to_json(music: Music) -> Dict[str, Any]:
-    return {c.name: getattr(music, c.name) for c in music.__table__.columns}
+    return dict(zip(_MUSIC_COLUMN_NAMES, _get_music_values(music)))
+
+# 补充播放/封面/缩略图URL
+
+_PLAY_PREFIX = "/music/play/"
+_COVER_PREFIX = "/music/cover/"
+_THUMBNAIL_PREFIX = "/music/thumbnail/"
+
+def attach_urls(music_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """为音乐字典补充 play_url、cover_url、thumbnail_url（原地修改并返回）"""
+    music_dict['play_url'] = _PLAY_PREFIX + music_dict['uuid']
+    cover_uuid = music_dict['cover_uuid']
+    if cover_uuid:
+        music_dict['cover_url'] = _COVER_PREFIX + cover_uuid
+        music_dict['thumbnail_url'] = _THUMBNAIL_PREFIX + cover_uuid
+    else:
+        music_dict['cover_url'] = None
+        music_dict['thumbnail_url'] = None
+    return music_dict
+
+# 批量补充URL（列表/搜索/推荐接口）
+
+def rows_to_cards(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    为服务层返回的字典行批量补充 play_url、cover_url、thumbnail_url（原地修改）
+    
+    Args:
+        rows: 音乐字典列表
+    
+    Returns:
+        同一个列表，便于直接放入响应
+    """
+    for row in rows:
+        row['play_url'] = _PLAY_PREFIX + row['uuid']
+        cover_uuid = row['cover_uuid']
+        if cover_uuid:
+            row['cover_url'] = _COVER_PREFIX + cover_uuid
+            row['thumbnail_url'] = _THUMBNAIL_PREFIX + cover_uuid
+        else:
+            row['cover_url'] = None
+            row['thumbnail_url'] = None
+    return rows
 
 # 批量序列化
 
-def musics_to_json(musics: List[Music]) -> List[Dict[str, Any]]:
-    return [music_to_json(m) for m in musics]
+def musics_to_json(musics: List[Any]) -> List[Dict[str, Any]]:
+    """支持 ORM 对象和 Core 查询返回的字典行（RowMapping），字典行直接复制"""
+    return [dict(m) if isinstance(m, Mapping) else music_to_json(m) for m in musics]
 
 # 从json转换为Music对象
 
@@ -187,51 +705,64 @@ def add_music_from_client(db: Session, music_data: Dict[str, Any]) -> Music:
         if field not in music_data:
             raise ValueError(f"缺少必要字段: {field}")
     
-    # 检查 (md5, device_id) 是否已存在
-    existing = db.query(Music).filter(
-        Music.md5 == music_data["md5"],
-        Music.device_id == music_data["device_id"]
-    ).first()
-    
-    if existing:
-        raise ValueError(f"该设备已存在相同MD5的音乐: {existing.uuid}")
-    
-    # 创建音乐记录
-    music = Music(**music_data)
-    db.add(music)
-    db.commit()
-    db.refresh(music)
+    # 直接插入，由 (md5, device_id) 唯一索引判重；只在冲突时再查询已有记录用于报错
+    try:
+        db.execute(insert(Music).values(music_data))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing_uuid = db.scalar(select(Music.uuid).where(
+            Music.md5 == music_data["md5"],
+            Music.device_id == music_data["device_id"]
+        ))
+        if existing_uuid is None:
+            raise
+        raise ValueError(f"该设备已存在相同MD5的音乐: {existing_uuid}")
+    invalidate_count_cache()
     
-    return music
+    # 返回未绑定会话的对象，不再回查数据库
+    return Music(**music_data)
 
 
 def query_music_by_device(
     db: Session,
     device_id: Optional[str] = None,
     page: int = 1,
-    page_size: int = 10
+    page_size: int = 10,
+    cursor: Optional[str] = None,
+    skip_count: bool = False
 ) -> Dict[str, Any]:
     """
-    按设备ID查询音乐列表（分页）
+    按设备ID查询音乐列表（分页），按添加时间倒序
     
     Args:
         db: 数据库会话
         device_id: 设备ID，None表示查询所有设备的音乐
-        page: 页码
+        page: 页码（传入 cursor 时忽略）
         page_size: 每页数量
+        cursor: 游标，传入时使用游标分页，不返回总数
+        skip_count: 页码分页时不计算总数（total 为 None）
     
     Returns:
-        dict: {'total': 总数, 'list': 音乐列表}
+        dict: {'total': 总数, 'list': 音乐字典列表（不含歌词）}
+              游标分页时为 {'list': ..., 'next_cursor': ...}
     """
-    q = db.query(Music)
+    list_key = (device_id, None if cursor else page, page_size, cursor, skip_count)
+    cached = _cached_page(list_key)
+    if cached is not None:
+        return cached
     
-    if device_id:
-        q = q.filter(Music.device_id == device_id)
+    stmt = select(*LIST_COLUMNS)
     
-    total = q.count()
-    items = q.offset((page-1)*page_size).limit(page_size).all()
+    if device_id:
+        stmt = stmt.where(Music.device_id == device_id)
     
-    return {"total": total, "list": items}
+    if cursor:
+        result = _keyset_rows(db, stmt, cursor, page_size)
+    else:
+        result = _paginate_with_cursor(db, stmt, page, page_size, ("device", device_id), skip_count)
+    _store_page(list_key, result)
+    return result
 
 
 def delete_music_by_device(db: Session, uuid: str, device_id: str) -> bool:
@@ -246,16 +777,16 @@ def delete_music_by_device(db: Session, uuid: str, device_id: str) -> bool:
     Returns:
         bool: 是否删除成功
     """
-    music = db.query(Music).filter(
-        Music.uuid == uuid,
-        Music.device_id == device_id
-    ).first()
-    
-    if not music:
+    # 单条 DELETE 同时完成权限校验与删除（MySQL 不支持 RETURNING，以影响行数判断）
+    result = db.execute(
+        delete(Music).where(Music.uuid == uuid, Music.device_id == device_id)
+    )
+    db.commit()
+    if result.rowcount == 0:
         return False
     
-    db.delete(music)
-    db.commit()
+    invalidate_music_cache(uuid)
+    invalidate_count_cache()
     return True
 
 
@@ -266,39 +797,93 @@ def fuzzy_query_music_by_device(
     author: Optional[str] = None,
     album: Optional[str] = None,
     page: int = 1,
-    page_size: int = 10
+    page_size: int = 10,
+    skip_count: bool = False,
+    cursor: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    按设备ID模糊搜索音乐
+    按设备ID模糊搜索音乐，按添加时间倒序
     
     Args:
         db: 数据库会话
         device_id: 设备ID，None表示搜索所有设备
         name, author, album: 搜索关键词（OR逻辑）
-        page, page_size: 分页参数
+        page, page_size: 分页参数（传入 cursor 时忽略 page）
+        skip_count: 不计算总数（total 为 None）
+        cursor: 游标，传入时使用游标分页，不返回总数
     
     Returns:
-        dict: {'total': 总数, 'list': 音乐列表}
+        dict: {'total': 总数, 'list': 音乐字典列表（不含歌词）, 'next_cursor': 下一页游标}
+              游标分页时为 {'list': ..., 'next_cursor': ...}
     """
-    q = db.query(Music)
+    name, author, album = _normalize_keyword(name), _normalize_keyword(author), _normalize_keyword(album)
+    # 关键词全为空白时直接返回空结果，不查询数据库
+    if not (name or author or album):
+        return {"total": None if skip_count else 0, "list": [], "next_cursor": None}
+    
+    stmt = select(*LIST_COLUMNS)
     
     # 设备过滤
     if device_id:
-        q = q.filter(Music.device_id == device_id)
+        stmt = stmt.where(Music.device_id == device_id)
     
-    # 构建 OR 条件
-    conditions = []
-    if name:
-        conditions.append(Music.name.like(f"%{name}%"))
-    if author:
-        conditions.append(Music.author.like(f"%{author}%"))
-    if album:
-        conditions.append(Music.album.like(f"%{album}%"))
+    # 构建 OR 条件（MySQL 上走全文索引）
+    condition = _text_search_condition(db, name, author, album)
+    if condition is not None:
+        stmt = stmt.where(condition)
     
-    if conditions:
-        q = q.filter(or_(*conditions))
+    if cursor:
+        return _keyset_rows(db, stmt, cursor, page_size)
     
-    total = q.count()
-    items = q.offset((page-1)*page_size).limit(page_size).all()
+    return _paginate_with_cursor(
+        db, stmt, page, page_size, ("fuzzy", device_id, name, author, album), skip_count
+    )
+
+
+def backfill_local_paths(db: Session) -> Dict[str, int]:
+    """
+    为缺少 local_path 的服务端音乐回填本地路径（一次性迁移）
     
-    return {"total": total, "list": items}
+    播放接口只读取 local_path，不再按文件名探测文件；
+    旧数据通过此函数在 MUSIC_DIR 中按文件名匹配一次并写回
+    
+    Args:
+        db: 数据库会话
+    
+    Returns:
+        dict: {'total': 待回填数, 'filled': 回填成功数, 'missing': 未找到文件数}
+    """
+    music_dir = Path(Config.MUSIC_DIR)
+    
+    # 只列一次目录，之后按文件名查表 / List the directory once, then look up by name
+    files = {}
+    if music_dir.is_dir():
+        files = {p.name: p for p in music_dir.iterdir() if p.is_file()}
+    
+    # 只加载匹配文件名和回写所需的列，不读取歌词、波形等大字段
+    musics = db.query(Music).options(
+        load_only(Music.uuid, Music.name, Music.author, Music.local_path)
+    ).filter(
+        Music.device_id == "server",
+        or_(Music.local_path.is_(None), Music.local_path == "")
+    ).all()
+    
+    filled = 0
+    for music in musics:
+        for ext in Config.MUSIC_EXTS:
+            candidates = (
+                f"{music.name} - {music.author}{ext}",
+                f"{music.name}-{music.author}{ext}",
+                f"{music.author} - {music.name}{ext}",
+            )
+            found = next((files[name] for name in candidates if name in files), None)
+            if found:
+                music.local_path = str(found.absolute())
+                filled += 1
+                break
+    
+    # 提交前取出 uuid：提交后属性过期，逐个访问会逐行重新查询整行
+    uuids = [music.uuid for music in musics]
+    db.commit()
+    invalidate_music_cache(*uuids)
+    return {"total": len(musics), "filled": filled, "missing": len(musics) - filled}
@@ -1,26 +1,36 @@
 """
 推荐相关服务
 """
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.models.music import Music
-import random
-from typing import List
+from app.services.music_service import LIST_COLUMNS
+from typing import Any, Dict, List
 
-def get_hot_recommendations(db: Session, limit: int = 100, pick: int = 30) -> List[Music]:
+def _pick_by_play_count(db: Session, order, limit: int, pick: int) -> List[Dict[str, Any]]:
+    """
+    按播放量排序取前limit首，在数据库内随机选pick首，返回字典行（不含歌词）
+    子查询按 play_count 索引只取UUID，外层仅关联这limit行后 ORDER BY RAND()，一条语句完成
+    """
+    top = select(Music.uuid).order_by(order).limit(limit).subquery()
+    stmt = (
+        select(*LIST_COLUMNS)
+        .join(top, Music.uuid == top.c.uuid)
+        .order_by(func.random())
+        .limit(pick)
+    )
+    return [dict(row) for row in db.execute(stmt).mappings().all()]
+
+
+def get_hot_recommendations(db: Session, limit: int = 100, pick: int = 30) -> List[Dict[str, Any]]:
     """
     播放量由高到低排序，取前limit首，随机选pick首
     """
-    musics = db.query(Music).order_by(Music.play_count.desc()).limit(limit).all()
-    if len(musics) <= pick:
-        return musics
-    return random.sample(musics, pick)
+    return _pick_by_play_count(db, Music.play_count.desc(), limit, pick)
 
 
-def get_cold_recommendations(db: Session, limit: int = 200, pick: int = 15) -> List[Music]:
+def get_cold_recommendations(db: Session, limit: int = 200, pick: int = 15) -> List[Dict[str, Any]]:
     """
     播放量由低到高排序，取前limit首，随机选pick首
     """
-    musics = db.query(Music).order_by(Music.play_count.asc()).limit(limit).all()
-    if len(musics) <= pick:
-        return musics
-    return random.sample(musics, pick)
+    return _pick_by_play_count(db, Music.play_count.asc(), limit, pick)
@@ -0,0 +1,141 @@
+"""
+封面/缩略图路径索引
+cover_uuid -> 文件路径，避免每次请求按扩展名逐个探测文件
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+from app.config import Config
+from app.log import logger
+
+
+# 图片MIME类型映射
+IMAGE_MIME = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.bmp': 'image/bmp'
+}
+
+# 封面文件写入后不再修改，索引只增不减（删除封面后调用 clear_cover_index）
+# dict 单次读写在 GIL 下是原子的，扫描线程与请求线程可并发访问
+_covers: Dict[str, Tuple[str, str]] = {}
+_thumbnails: Dict[str, str] = {}
+
+
+# 封面/缩略图目录是否已创建，进程内只需 mkdir 一次
+_dirs_ready = False
+
+
+def ensure_cover_dirs():
+    """确保封面与缩略图目录存在（进程内只创建一次，代替每次写文件前 mkdir）"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    os.makedirs(Config.COVER_DIR, exist_ok=True)
+    os.makedirs(Config.THUMBNAIL_DIR, exist_ok=True)
+    _dirs_ready = True
+
+
+def register_cover(cover_uuid: str, path: str):
+    """登记封面文件路径（保存封面后调用）"""
+    ext = os.path.splitext(path)[1].lower()
+    _covers[cover_uuid] = (path, IMAGE_MIME.get(ext, 'application/octet-stream'))
+
+
+def register_thumbnail(cover_uuid: str, path: str):
+    """登记缩略图文件路径（生成缩略图后调用）"""
+    _thumbnails[cover_uuid] = path
+
+
+def load_cover_index() -> int:
+    """
+    扫描封面/缩略图目录建立索引（启动时调用一次）
+    每个目录一次 scandir，代替请求时按扩展名逐个 stat
+
+    Returns:
+        int: 索引的封面数量
+    """
+    for directory, exts, register in (
+        (Config.COVER_DIR, Config.COVER_EXT_SET, register_cover),
+        (Config.THUMBNAIL_DIR, (".jpg",), register_thumbnail),
+    ):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    stem, ext = os.path.splitext(entry.name)
+                    if ext.lower() in exts and entry.is_file():
+                        register(stem, entry.path)
+        except FileNotFoundError:
+            logger.warning(f"目录不存在，跳过索引: {directory}")
+    logger.info(f"封面索引已加载 / Cover index loaded: {len(_covers)} covers, {len(_thumbnails)} thumbnails")
+    return len(_covers)
+
+
+def clear_cover_index():
+    """清空封面/缩略图索引（封面被删除或替换后调用）"""
+    _covers.clear()
+    _thumbnails.clear()
+
+
+def cached_cover_path(cover_uuid: str) -> Optional[Tuple[str, str]]:
+    """只查索引的封面路径及MIME类型（不访问文件系统，可在事件循环中调用）"""
+    return _covers.get(cover_uuid)
+
+
+def cached_thumbnail_path(cover_uuid: str) -> Optional[str]:
+    """只查索引的缩略图路径（不访问文件系统，可在事件循环中调用）"""
+    return _thumbnails.get(cover_uuid)
+
+
+def _is_plain_name(name: str) -> bool:
+    """是否为不含路径分隔符、不以点开头的文件名，防止 ../ 逃出封面目录"""
+    return bool(name) and not name.startswith(".") and "/" not in name and "\\" not in name
+
+
+def resolve_cover_path(cover_uuid: str) -> Optional[Tuple[str, str]]:
+    """
+    解析封面文件路径及MIME类型
+
+    未登记时回退到按扩展名探测（索引建立后由外部放入的文件），找到后登记
+    含路径分隔符的名称不做探测，直接返回None
+
+    Args:
+        cover_uuid: 封面UUID
+
+    Returns:
+        (路径, MIME类型)，未找到返回None
+    """
+    resolved = _covers.get(cover_uuid)
+    if resolved is not None or not _is_plain_name(cover_uuid):
+        return resolved
+
+    base = os.path.join(Config.COVER_DIR, cover_uuid)
+    for ext in Config.COVER_EXTS:
+        test_path = base + ext
+        if os.path.isfile(test_path):
+            register_cover(cover_uuid, test_path)
+            return _covers[cover_uuid]
+    return None
+
+
+def resolve_thumbnail_path(cover_uuid: str) -> Optional[str]:
+    """
+    解析缩略图文件路径（缩略图统一为.jpg格式）
+
+    Args:
+        cover_uuid: 封面UUID
+
+    Returns:
+        缩略图路径，未找到返回None
+    """
+    resolved = _thumbnails.get(cover_uuid)
+    if resolved is not None or not _is_plain_name(cover_uuid):
+        return resolved
+
+    thumbnail_path = os.path.join(Config.THUMBNAIL_DIR, f"{cover_uuid}.jpg")
+    if not os.path.isfile(thumbnail_path):
+        return None
+    register_thumbnail(cover_uuid, thumbnail_path)
+    return thumbnail_path
@@ -3,6 +3,7 @@
 支持从文件名和元数据中提取标准化的音乐信息
 """
 import re
+from functools import lru_cache
 from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
@@ -16,45 +17,60 @@ BRACKET_INFO_PATTERNS = {
     'feat': r'(feat\.|featuring|ft\.|with)',
 }
 
-def extract_bracket_info(text: str) -> Dict[str, str]:
+# 所有模式合并为一个正则，导入时编译一次，一次匹配即可分类
+# 每个分支以 ^(?=...) 锚定在开头并按字典顺序尝试，与逐个 search 时“按顺序取第一个匹配的类型”一致；
+# 末尾的空命名组用于通过 lastgroup 取得类型名
+_BRACKET_COMBINED = re.compile(
+    '|'.join(rf'^(?=[\s\S]*?(?:{p}))(?P<{k}>)' for k, p in BRACKET_INFO_PATTERNS.items()),
+    re.IGNORECASE
+)
+
+# 括号内容（支持 ()、（）、[]、<>、【】）
+_BRACKET_PATTERN = re.compile(r'[\(（\[<【]([^\)）\]>】]+)[\)）\]>】]')
+_REMOVE_BRACKETS = re.compile(r'[\(（\[<【][^\)）\]>】]*[\)）\]>】]')
+
+# 扫描整个音乐库时，歌手名和 "(国语版)"、"(Live)" 等括号内容大量重复，解析结果按输入文本缓存
+_PARSE_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
+def _extract_bracket_info_cached(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
     """
-    提取括号内的附加信息
-    支持 ()、[]、<>、【】等括号
+    解析括号信息（带缓存），返回不可变结果
+    
+    Returns:
+        (按 BRACKET_INFO_PATTERNS 顺序的各类型内容, other 列表)
     """
-    info = {
-        'version': '',
-        'source': '',
-        'type': '',
-        'style': '',
-        'mix': '',
-        'feat': '',
-        'other': []
-    }
+    info = dict.fromkeys(BRACKET_INFO_PATTERNS, '')
+    other = []
     
     # 匹配所有括号内容
-    bracket_pattern = r'[\(（\[<【]([^\)）\]>】]+)[\)）\]>】]'
-    brackets = re.findall(bracket_pattern, text)
-    
-    for bracket_content in brackets:
-        matched = False
+    for bracket_content in _BRACKET_PATTERN.findall(text):
         # 检查是否匹配已知模式
-        for key, pattern in BRACKET_INFO_PATTERNS.items():
-            if re.search(pattern, bracket_content, re.IGNORECASE):
-                if not info[key]:  # 只保留第一个匹配
-                    info[key] = bracket_content.strip()
-                matched = True
-                break
-        
-        # 未匹配的信息放入other
-        if not matched:
-            info['other'].append(bracket_content.strip())
+        m = _BRACKET_COMBINED.match(bracket_content)
+        if m:
+            key = m.lastgroup
+            if not info[key]:  # 只保留第一个匹配
+                info[key] = bracket_content.strip()
+        else:
+            # 未匹配的信息放入other
+            other.append(bracket_content.strip())
     
+    return tuple(info.values()), tuple(other)
+
+def extract_bracket_info(text: str) -> Dict[str, str]:
+    """
+    提取括号内的附加信息
+    支持 ()、[]、<>、【】等括号
+    """
+    values, other = _extract_bracket_info_cached(text)
+    info = dict(zip(BRACKET_INFO_PATTERNS, values))
+    info['other'] = list(other)
     return info
 
+@lru_cache(maxsize=_PARSE_CACHE_SIZE)
 def remove_brackets(text: str) -> str:
     """移除所有括号及其内容"""
-    bracket_pattern = r'[\(（\[<【][^\)）\]>】]*[\)）\]>】]'
-    return re.sub(bracket_pattern, '', text).strip()
+    return _REMOVE_BRACKETS.sub('', text).strip()
 
 def parse_filename(filename: str) -> Tuple[str, str]:
     """
@@ -110,12 +126,10 @@ def normalize_music_info(filename: str, metadata: Optional[Dict[str, Any]] = Non
     bracket_info_part2 = extract_bracket_info(part2)
     
     # 合并括号信息
-    bracket_info = {}
-    for k in bracket_info_part1.keys():
-        if k == 'other':
-            bracket_info[k] = list(bracket_info_part1['other']) + list(bracket_info_part2.get('other', []))
-        else:
-            bracket_info[k] = bracket_info_part1[k] or bracket_info_part2.get(k, '')
+    bracket_info = {
+        k: bracket_info_part1[k] or bracket_info_part2[k] for k in BRACKET_INFO_PATTERNS
+    }
+    bracket_info['other'] = bracket_info_part1['other'] + bracket_info_part2['other']
     
     # 移除括号后的纯净文本
     clean_part1 = remove_brackets(part1)
@@ -148,16 +162,19 @@ def normalize_music_info(filename: str, metadata: Optional[Dict[str, Any]] = Non
         'original_filename': filename,
     }
     
+    # 关键字判断共用一次小写转换
+    lower_filename = filename.lower()
+    
     # 如果是伴奏，标记类型
-    if '伴奏' in filename or 'instrumental' in filename.lower() or 'inst.' in filename.lower() or 'inst_' in filename.lower():
+    if '伴奏' in filename or 'instrumental' in lower_filename or 'inst.' in lower_filename or 'inst_' in lower_filename:
         normalized['type'] = '伴奏'
     
     # 如果是live版本
-    if 'live' in filename.lower():
+    if 'live' in lower_filename:
         normalized['type'] = 'Live'
     
     # 如果是Remix
-    if 'remix' in filename.lower() or 'mix)' in filename.lower():
+    if 'remix' in lower_filename or 'mix)' in lower_filename:
         if not normalized['mix']:
             normalized['mix'] = 'Remix'
     
@@ -4,24 +4,76 @@
 """
 import os
 import hashlib
+import mmap
 import shutil
+import threading
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from uuid import uuid4
+import charset_normalizer
+from sqlalchemy import update
+from sqlalchemy.exc import DataError, IntegrityError
 from sqlalchemy.orm import Session
 
 from app.config import Config
 from app.utils.music_filename_parser import normalize_music_info
 from app.models.music import Music
-from app.services.music_service import add_music, music_exists
+from app.services.music_service import (
+    add_musics, invalidate_music_cache, invalidate_count_cache, get_local_file_signatures,
+    get_server_musics_by_md5, get_musics_by_name_author, name_author_key
+)
 from app.log import logger
 from app.utils.thumbnail_generator import generate_thumbnail_for_cover_uuid
+from app.utils.cover_index import ensure_cover_dirs, register_cover
+from app.utils.uuid7 import uuid7
+
+try:
+    from mutagen._file import File as MutagenFile
+    from mutagen.id3 import ID3
+except ImportError:
+    MutagenFile = None
+    ID3 = None
+
+# 可选：pytaglib（TagLib C++ 绑定）解析标签比纯 Python 的 mutagen 快数倍
+# 3.2 起才支持读取内嵌封面，旧版本或未安装时使用 mutagen
+try:
+    import taglib
+    if not hasattr(taglib.File, 'pictures'):
+        taglib = None
+except ImportError:
+    taglib = None
 
 # 从配置中获取支持的格式
 SUPPORTED_FORMATS = Config.MUSIC_EXTS
 LYRIC_FORMATS = Config.LYRICS_EXTS
 COVER_FORMATS = Config.COVER_EXTS
 
+# 扫描导入时每批写入的新音乐数量（一条 INSERT 批量执行）
+IMPORT_BATCH_SIZE = 200
+
+def _copy_file(src: str, dst: Path):
+    """
+    复制文件内容（不保留元数据，目标文件名为 UUID，无需 copy2）
+    Linux 上优先 os.copy_file_range，在内核内完成复制（btrfs/XFS 可直接 reflink）
+    不支持时（非 Linux、跨文件系统的旧内核等）回退 shutil.copyfile
+    """
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
 def save_cover_file(cover_source_path: str) -> Optional[str]:
     """
     保存封面文件到统一目录，返回UUID
@@ -33,9 +85,8 @@ def save_cover_file(cover_source_path: str) -> Optional[str]:
         封面UUID，失败返回None
     """
     try:
-        # 确保封面目录存在
+        # 封面目录由 ensure_cover_dirs() 在扫描开始时创建
         cover_dir = Path(Config.COVER_DIR)
-        cover_dir.mkdir(parents=True, exist_ok=True)
         
         source_path = Path(cover_source_path)
         if not source_path.exists():
@@ -48,7 +99,8 @@ def save_cover_file(cover_source_path: str) -> Optional[str]:
         dest_path = cover_dir / dest_filename
         
         # 复制文件
-        shutil.copy2(cover_source_path, dest_path)
+        _copy_file(cover_source_path, dest_path)
+        register_cover(cover_uuid, str(dest_path))
         logger.info(f"封面已保存: {dest_filename}")
         
         # 自动生成缩略图
@@ -60,9 +112,15 @@ def save_cover_file(cover_source_path: str) -> Optional[str]:
         logger.error(f"保存封面文件失败 {cover_source_path}: {e}")
         return None
 
+# 本次扫描已保存的内嵌封面：内容MD5 -> 封面UUID
+# 同一专辑的每首歌通常内嵌同一张封面，只写入一次文件、生成一次缩略图；扫描结束时清空
+_embedded_covers: Dict[str, str] = {}
+_embedded_covers_lock = threading.Lock()
+
 def save_cover_data(cover_data: bytes, mime_type: str = 'image/jpeg') -> Optional[str]:
     """
     从二进制数据保存封面文件，返回UUID
+    本次扫描中内容相同的封面直接复用已保存的UUID
     
     Args:
         cover_data: 封面二进制数据
@@ -72,9 +130,14 @@ def save_cover_data(cover_data: bytes, mime_type: str = 'image/jpeg') -> Optiona
         封面UUID，失败返回None
     """
     try:
-        # 确保封面目录存在
+        digest = hashlib.md5(cover_data).hexdigest()
+        with _embedded_covers_lock:
+            cover_uuid = _embedded_covers.get(digest)
+        if cover_uuid:
+            return cover_uuid
+        
+        # 封面目录由 ensure_cover_dirs() 在扫描开始时创建
         cover_dir = Path(Config.COVER_DIR)
-        cover_dir.mkdir(parents=True, exist_ok=True)
         
         # 根据MIME类型确定扩展名
         ext_map = {
@@ -94,11 +157,14 @@ def save_cover_data(cover_data: bytes, mime_type: str = 'image/jpeg') -> Optiona
         # 写入文件
         with open(dest_path, 'wb') as f:
             f.write(cover_data)
+        register_cover(cover_uuid, str(dest_path))
+        with _embedded_covers_lock:
+            _embedded_covers[digest] = cover_uuid
         
         logger.info(f"内嵌封面已保存: {dest_filename}")
         
-        # 自动生成缩略图
-        generate_thumbnail_for_cover_uuid(cover_uuid)
+        # 自动生成缩略图（直接使用内存中的封面数据，不再读回刚写入的文件）
+        generate_thumbnail_for_cover_uuid(cover_uuid, cover_data)
         
         return cover_uuid
         
@@ -106,77 +172,154 @@ def save_cover_data(cover_data: bytes, mime_type: str = 'image/jpeg') -> Optiona
         logger.error(f"保存封面数据失败: {e}")
         return None
 
-def find_cover_file(music_file_path: str) -> Optional[str]:
+@lru_cache(maxsize=256)
+def _dir_entries(directory: str) -> frozenset:
     """
-    在同目录查找同名封面文件
-    优先级：.jpg > .png > .jpeg > .webp > .bmp
+    目录内文件名集合（按目录缓存）
+    同一专辑目录下的多首歌共用一次 listdir，代替逐个扩展名 exists()
+    缓存在 scan_and_import_folder 结束时清空
     """
+    try:
+        return frozenset(os.listdir(directory))
+    except OSError:
+        return frozenset()
+
+def _find_sidecar_file(music_file_path: str, exts) -> Optional[str]:
+    """按扩展名优先级在同目录查找同名文件"""
     music_path = Path(music_file_path)
     base_name = music_path.stem
     directory = music_path.parent
+    entries = _dir_entries(str(directory))
     
-    for ext in COVER_FORMATS:
-        cover_path = directory / f"{base_name}{ext}"
-        if cover_path.exists():
-            return str(cover_path)
+    for ext in exts:
+        name = f"{base_name}{ext}"
+        if name in entries:
+            return str(directory / name)
     
     return None
 
+def find_cover_file(music_file_path: str) -> Optional[str]:
+    """
+    在同目录查找同名封面文件
+    优先级：.jpg > .png > .jpeg > .webp > .bmp
+    """
+    return _find_sidecar_file(music_file_path, COVER_FORMATS)
+
 def find_lyric_file(music_file_path: str) -> Optional[str]:
     """
     在同目录查找同名歌词文件
     优先级：.lrc > .txt
     """
-    music_path = Path(music_file_path)
-    base_name = music_path.stem
-    directory = music_path.parent
-    
-    for ext in LYRIC_FORMATS:
-        lyric_path = directory / f"{base_name}{ext}"
-        if lyric_path.exists():
-            return str(lyric_path)
-    
-    return None
+    return _find_sidecar_file(music_file_path, LYRIC_FORMATS)
 
 def read_lyric_file(lyric_path: str) -> str:
-    """读取歌词文件内容"""
+    """
+    读取歌词文件内容（只读取一次）
+    先按 UTF-8（可带 BOM）解码，失败时由 charset-normalizer 检测编码（GBK、Big5、Shift-JIS、UTF-16 等）
+    """
     try:
-        with open(lyric_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except UnicodeDecodeError:
-        # 尝试其他编码
-        try:
-            with open(lyric_path, 'r', encoding='gbk') as f:
-                return f.read()
-        except Exception as e:
-            logger.error(f"读取歌词文件失败 {lyric_path}: {e}")
-            return ""
+        with open(lyric_path, 'rb') as f:
+            raw = f.read()
     except Exception as e:
         logger.error(f"读取歌词文件失败 {lyric_path}: {e}")
         return ""
+    
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        pass
+    
+    results = charset_normalizer.from_bytes(raw)
+    best = results.best()
+    if best is None:
+        return raw.decode('gbk', errors='replace')
+    # 短歌词常有多个编码同样“干净”，此时优先 GB18030（兼容 GBK，中文歌词最常见）
+    for match in results:
+        if match.encoding == 'gb18030' and match.chaos <= best.chaos:
+            best = match
+            break
+    return str(best)
 
-def calculate_file_md5(file_path: str, chunk_size: int = 8192) -> str:
-    """计算文件MD5值"""
+# 计算MD5时每次读取的块大小，块越大 Python 循环次数越少
+MD5_CHUNK_SIZE = 1024 * 1024
+
+def _md5_of_open_file(f, size: int, chunk_size: int = MD5_CHUNK_SIZE) -> str:
+    """
+    计算已打开文件（二进制模式）的MD5值，读取后文件位置不确定，需要时由调用方 seek
+    不超过 Config.MD5_MMAP_MAX_MB 的文件整体 mmap 后直接哈希，省去读入用户态缓冲区的复制
+    更大的文件：Python 3.11+ 使用 hashlib.file_digest，读取循环在 C 中完成
+    Linux 上提示内核顺序读取，加大预读窗口
+    """
+    if 0 < size <= Config.MD5_MMAP_MAX_MB * 1024 * 1024:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return hashlib.md5(mm).hexdigest()
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    if hasattr(hashlib, 'file_digest'):
+        return hashlib.file_digest(f, 'md5').hexdigest()
     md5_hash = hashlib.md5()
+    while chunk := f.read(chunk_size):
+        md5_hash.update(chunk)
+    return md5_hash.hexdigest()
+
+def calculate_file_md5(file_path: str, chunk_size: int = MD5_CHUNK_SIZE) -> str:
+    """计算文件MD5值"""
     try:
-        with open(file_path, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                md5_hash.update(chunk)
-        return md5_hash.hexdigest()
+        with open(file_path, 'rb', buffering=0) as f:
+            return _md5_of_open_file(f, os.fstat(f.fileno()).st_size, chunk_size)
     except Exception as e:
         logger.error(f"计算MD5失败 {file_path}: {e}")
         return ""
 
-def extract_audio_metadata(file_path: str) -> Dict[str, Any]:
+def _first_tag(tags: Dict[str, List[str]], key: str) -> str:
+    values = tags.get(key)
+    return values[0] if values else ''
+
+def _extract_metadata_taglib(file_path: str) -> Optional[Dict[str, Any]]:
     """
-    使用mutagen提取音频元数据
+    使用 TagLib（C++）提取音频元数据，字段与 mutagen 路径一致
+    TagLib 无法打开的文件返回 None，交给 mutagen 处理
+    """
+    try:
+        with taglib.File(file_path) as audio:
+            tags = audio.tags
+            metadata = {
+                'duration': int(audio.length or 0),
+                'bitrate': int(audio.bitrate or 0),  # TagLib 的比特率单位即为 kbps
+                'title': _first_tag(tags, 'TITLE'),
+                'artist': _first_tag(tags, 'ARTIST'),
+                'album': _first_tag(tags, 'ALBUM'),
+                'lyric': _first_tag(tags, 'LYRICS'),
+            }
+            pictures = audio.pictures
+            if pictures:
+                metadata['cover_data'] = pictures[0].data
+                metadata['cover_mime'] = pictures[0].mime_type or 'image/jpeg'
+                logger.info(f"找到内嵌封面 (TagLib)")
+            return metadata
+    except Exception as e:
+        logger.debug("TagLib 无法解析，改用 mutagen {}: {}", file_path, e)
+        return None
+
+def extract_audio_metadata(file_path: str, fileobj=None) -> Dict[str, Any]:
+    """
+    提取音频元数据：已安装 pytaglib 时使用 TagLib，否则（或 TagLib 无法解析时）使用mutagen
     返回包含title, artist, album, duration, bitrate, cover, lyric等信息的字典
+    fileobj: 可选，已打开的同一文件（二进制、位于开头），mutagen 直接从中读取，不再重新打开
     """
+    if taglib is not None:
+        metadata = _extract_metadata_taglib(file_path)
+        if metadata is not None:
+            return metadata
+    
     metadata = {}
+    if MutagenFile is None:
+        logger.warning("未安装mutagen库，无法提取音频元数据。建议: uv add mutagen")
+        return metadata
     try:
-        from mutagen._file import File as MutagenFile
-        
-        audio = MutagenFile(file_path)
+        audio = MutagenFile(fileobj if fileobj is not None else file_path)
         
         if audio is None:
             return metadata
@@ -188,49 +331,42 @@ def extract_audio_metadata(file_path: str) -> Dict[str, Any]:
             # 比特率（kbps）
             metadata['bitrate'] = int(getattr(audio.info, 'bitrate', 0) / 1000)
         
-        # 提取标签信息
-        tags = audio.tags if audio.tags else {}
+        # 提取标签信息，按标签类型只走一个分支
+        tags = audio.tags
         
-        # 不同格式的标签键名可能不同
-        # MP3 (ID3)
-        if hasattr(tags, 'get'):
-            metadata['title'] = str(tags.get('TIT2', [''])[0]) if 'TIT2' in tags else ''
-            metadata['artist'] = str(tags.get('TPE1', [''])[0]) if 'TPE1' in tags else ''
-            metadata['album'] = str(tags.get('TALB', [''])[0]) if 'TALB' in tags else ''
+        if isinstance(tags, ID3):
+            # MP3 (ID3)
+            metadata['title'] = str(tags['TIT2'][0]) if 'TIT2' in tags else ''
+            metadata['artist'] = str(tags['TPE1'][0]) if 'TPE1' in tags else ''
+            metadata['album'] = str(tags['TALB'][0]) if 'TALB' in tags else ''
             
-            # 提取歌词 (ID3)
-            if 'USLT' in tags:
-                uslt = tags.get('USLT')
-                if uslt:
-                    metadata['lyric'] = str(uslt[0]) if isinstance(uslt, list) else str(uslt)
+            # 歌词与封面帧的键带描述和语言后缀（如 USLT::eng、APIC:cover），用 getall 按帧类型取
+            uslt = tags.getall('USLT')
+            if uslt:
+                metadata['lyric'] = str(uslt[0])
             
-            # 提取封面 (ID3)
-            if 'APIC:' in tags or any(k.startswith('APIC') for k in tags.keys()):
-                for key in tags.keys():
-                    if key.startswith('APIC'):
-                        apic = tags[key]
-                        if hasattr(apic, 'data'):
-                            metadata['cover_data'] = apic.data
-                            metadata['cover_mime'] = apic.mime if hasattr(apic, 'mime') else 'image/jpeg'
-                            logger.info(f"找到内嵌封面 (ID3)")
-                            break
-        
-        # FLAC/OGG/MP4等使用字典式标签
-        if isinstance(tags, dict):
-            metadata['title'] = tags.get('title', [''])[0] if 'title' in tags else ''
-            metadata['artist'] = tags.get('artist', [''])[0] if 'artist' in tags else ''
-            metadata['album'] = tags.get('album', [''])[0] if 'album' in tags else ''
-            metadata['lyric'] = tags.get('lyrics', [''])[0] if 'lyrics' in tags else ''
+            apic = next((frame for frame in tags.getall('APIC') if frame.data), None)
+            if apic is not None:
+                metadata['cover_data'] = apic.data
+                metadata['cover_mime'] = apic.mime or 'image/jpeg'
+                logger.info(f"找到内嵌封面 (ID3)")
+        elif tags:
+            # FLAC/OGG/APE 等使用字典式标签（键不区分大小写）
+            metadata['title'] = tags['title'][0] if 'title' in tags else ''
+            metadata['artist'] = tags['artist'][0] if 'artist' in tags else ''
+            metadata['album'] = tags['album'][0] if 'album' in tags else ''
+            metadata['lyric'] = tags['lyrics'][0] if 'lyrics' in tags else ''
+        else:
+            metadata.update(title='', artist='', album='', lyric='')
         
         # FLAC 特殊处理封面
-        if hasattr(audio, 'pictures') and audio.pictures:
-            picture = audio.pictures[0]
+        pictures = getattr(audio, 'pictures', None)
+        if pictures:
+            picture = pictures[0]
             metadata['cover_data'] = picture.data
             metadata['cover_mime'] = picture.mime
             logger.info(f"找到内嵌封面 (FLAC)")
         
-    except ImportError:
-        logger.warning("未安装mutagen库，无法提取音频元数据。建议: uv add mutagen")
     except Exception as e:
         logger.error(f"提取音频元数据失败 {file_path}: {e}")
     
@@ -250,23 +386,36 @@ def scan_music_file(file_path: str, source: str = 'local') -> Optional[Dict[str,
     try:
         file_path_obj = Path(file_path)
         
-        # 检查文件是否存在且为支持的格式
-        if not file_path_obj.exists() or file_path_obj.suffix.lower() not in SUPPORTED_FORMATS:
+        # 检查是否为支持的格式（扩展名只计算一次）
+        ext = file_path_obj.suffix.lower()
+        if ext not in Config.MUSIC_EXT_SET:
             return None
         
-        # 获取文件基本信息
-        file_size = file_path_obj.stat().st_size
         filename = file_path_obj.name
-        file_format = file_path_obj.suffix.lower().lstrip('.')  # 获取文件格式（不带点）
+        file_format = ext[1:]  # 获取文件格式（不带点）
         
-        # 计算MD5
-        file_md5 = calculate_file_md5(file_path)
-        if not file_md5:
-            logger.warning(f"无法计算MD5，跳过文件: {filename}")
+        # 文件只打开一次：fstat 取基本信息，mmap 计算MD5，mutagen 再从同一文件对象读取标签（由页缓存提供）
+        try:
+            audio_file = open(file_path, 'rb')
+        except FileNotFoundError:
             return None
-        
-        # 提取音频元数据
-        audio_metadata = extract_audio_metadata(file_path)
+        with audio_file:
+            file_stat = os.fstat(audio_file.fileno())
+            file_size = file_stat.st_size
+            
+            # 计算MD5
+            try:
+                file_md5 = _md5_of_open_file(audio_file, file_size)
+            except Exception as e:
+                logger.error(f"计算MD5失败 {file_path}: {e}")
+                file_md5 = ""
+            if not file_md5:
+                logger.warning(f"无法计算MD5，跳过文件: {filename}")
+                return None
+            
+            # 提取音频元数据
+            audio_file.seek(0)
+            audio_metadata = extract_audio_metadata(file_path, audio_file)
         
         # 使用文件名解析工具规范化信息
         normalized = normalize_music_info(filename, audio_metadata)
@@ -307,7 +456,7 @@ def scan_music_file(file_path: str, source: str = 'local') -> Optional[Dict[str,
         
         # 构建Music模型数据
         music_data = {
-            'uuid': str(uuid4()),
+            'uuid': str(uuid7()),
             'md5': file_md5,
             'device_id': 'server',  # 服务端音乐
             'name': normalized['name'],
@@ -319,6 +468,7 @@ def scan_music_file(file_path: str, source: str = 'local') -> Optional[Dict[str,
             'bitrate': audio_metadata.get('bitrate', 0),
             'file_format': file_format,  # 文件格式
             'local_path': str(file_path_obj.absolute()),  # 服务端本地路径
+            'mtime_ns': file_stat.st_mtime_ns,  # 文件修改时间，重复扫描时判断文件是否变化
             'waveform': None,  # 波形数据可后续生成
             'cover_uuid': cover_uuid,  # 封面UUID
             'lyric': audio_metadata.get('lyric', ''),
@@ -385,14 +535,40 @@ def merge_music_info(new_music: Dict[str, Any], old_music: Music) -> Dict[str, A
     if not merged.get('cover_uuid') and old_music.cover_uuid is not None:
         merged['cover_uuid'] = old_music.cover_uuid
     
-    # 保留播放次数
-    merged['play_count'] = old_music.play_count
+    # 播放次数不参与更新，保留数据库中的值（由播放计数器原子累加，回写旧值会丢失期间的播放）
+    merged.pop('play_count', None)
     
     # 保留UUID
     merged['uuid'] = old_music.uuid
     
     return merged
 
+def _skip_unchanged_files(db: Session, entries: List[os.DirEntry], stats: Dict[str, Any]) -> List[os.DirEntry]:
+    """
+    过滤掉数据库中已有记录且文件大小、修改时间均未变化的文件（一次批量查询）
+    被跳过的文件计入 stats 的 total 和 skipped
+    """
+    paths = [str(Path(entry.path).absolute()) for entry in entries]
+    signatures = get_local_file_signatures(db, paths)
+    if not signatures:
+        return entries
+    
+    remaining = []
+    for entry, path in zip(entries, paths):
+        signature = signatures.get(path)
+        if signature is not None:
+            try:
+                st = entry.stat()
+            except OSError:
+                st = None
+            if st is not None and (st.st_size, st.st_mtime_ns) == signature:
+                stats['total'] += 1
+                stats['skipped'] += 1
+                logger.debug("文件未变化，跳过: {}", entry.name)
+                continue
+        remaining.append(entry)
+    return remaining
+
 def scan_and_import_folder(
     folder_path: str, 
     db: Session, 
@@ -428,139 +604,245 @@ def scan_and_import_folder(
             logger.error(f"文件夹不存在或不是目录: {folder_path}")
             return stats
         
-        # 遍历文件夹内所有文件（不递归）
-        for file_path in folder.iterdir():
-            if not file_path.is_file():
-                continue
+        ensure_cover_dirs()
+        
+        # 待写入的新音乐，攒满一批后一次批量插入
+        pending: List[Dict[str, Any]] = []
+        # 待写入批次的 MD5 与 name_author_key，同批判重为集合查找
+        pending_md5s: set = set()
+        pending_keys: set = set()
+        
+        # 判重用的已有记录：md5 -> 服务端音乐，name_author_key(歌名, 作者) -> 音乐；每批文件批量查询后放入
+        by_md5: Dict[str, Music] = {}
+        by_name: Dict[tuple, Music] = {}
+        
+        def load_existing(datas: List[Dict[str, Any]]):
+            by_md5.update(get_server_musics_by_md5(db, (data['md5'] for data in datas)))
+            if upgrade_quality:
+                by_name.update(get_musics_by_name_author(db, ((data['name'], data['author']) for data in datas)))
+        
+        # 已在会话中修改、等待提交的记录：(uuid, 修改的字段, 统计用的名称，None 表示不计入统计)
+        pending_updates: List[tuple] = []
+        
+        def flush_updates():
+            """一批文件的更新一次提交；失败时回滚并逐条重试，定位出错的记录"""
+            if not pending_updates:
+                return
+            try:
+                db.commit()
+                applied = list(pending_updates)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"批量更新失败，逐条重试: {e}")
+                applied = []
+                for item in pending_updates:
+                    uuid, changes, label = item
+                    try:
+                        db.execute(update(Music).where(Music.uuid == uuid).values(**changes))
+                        db.commit()
+                        applied.append(item)
+                    except Exception as e:
+                        db.rollback()
+                        if label:
+                            stats['failed'] += 1
+                        logger.error(f"更新失败 {label or uuid}: {e}")
+            pending_updates.clear()
             
-            # 检查是否为支持的音频格式
-            if file_path.suffix.lower() not in SUPPORTED_FORMATS:
-                continue
+            counted = [item for item in applied if item[2]]
+            for _, _, label in counted:
+                stats['upgraded'] += 1
+                stats['files'].append(label)
+            if counted:
+                invalidate_music_cache(*(uuid for uuid, _, _ in counted))
+                invalidate_count_cache()
+        
+        def flush_pending():
+            # 先提交已排队的更新，避免插入批次的提交带上未确认的修改
+            flush_updates()
+            if not pending:
+                return
+            try:
+                add_musics(db, pending)
+                inserted = list(pending)
+            except (IntegrityError, DataError) as e:
+                # 个别行违反唯一键或数据不合法时整批回滚，逐条重试，只有出错的文件计为失败
+                db.rollback()
+                logger.warning(f"批量写入失败，逐条重试（{len(pending)} 首）: {e}")
+                inserted = []
+                for data in pending:
+                    try:
+                        add_musics(db, [data])
+                        inserted.append(data)
+                    except Exception as e:
+                        db.rollback()
+                        stats['failed'] += 1
+                        logger.error(f"写入失败 {data['name']}: {e}")
+            except Exception as e:
+                db.rollback()
+                inserted = []
+                stats['failed'] += len(pending)
+                logger.error(f"数据库批量写入失败（{len(pending)} 首）: {e}")
+            stats['success'] += len(inserted)
+            for data in inserted:
+                stats['files'].append(data['name'])
+                logger.info(f"导入成功: {data['name']} by {data['author']}")
+            # 刚写入的记录也参与之后的判重
+            if inserted:
+                load_existing(inserted)
+            pending.clear()
+            pending_md5s.clear()
+            pending_keys.clear()
+        
+        # 文件夹内所有支持格式的音频文件（不递归）
+        # os.scandir 的 is_file() 直接使用目录项类型，大多数文件系统上无需逐个 stat
+        with os.scandir(folder) as entries:
+            audio_entries = [
+                entry for entry in entries
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in Config.MUSIC_EXT_SET
+            ]
+        
+        # 跳过已导入且大小、修改时间都未变化的文件，不再计算MD5和解析标签
+        if skip_existing:
+            audio_entries = _skip_unchanged_files(db, audio_entries, stats)
+        
+        # 多线程扫描文件（MD5 计算与文件读取会释放 GIL），数据库判重与写入仍在当前线程按顺序进行
+        with ThreadPoolExecutor(max_workers=Config.SCAN_WORKERS) as executor:
+            scanned = executor.map(lambda entry: scan_music_file(entry.path, source), audio_entries)
             
-            stats['total'] += 1
-            logger.info(f"正在处理: {file_path.name}")
+            # 每批文件的判重记录一次查询取回（MD5 一次、歌名+作者一次），代替每个文件两次查询
+            results = zip(audio_entries, scanned)
+            while True:
+                chunk = list(islice(results, IMPORT_BATCH_SIZE))
+                if not chunk:
+                    break
+                load_existing([data for _, data in chunk if data])
+                
+                for entry, music_data in chunk:
+                    stats['total'] += 1
+                    logger.info(f"正在处理: {entry.name}")
             
-            # 扫描文件
-            music_data = scan_music_file(str(file_path), source)
-            if not music_data:
-                stats['failed'] += 1
-                logger.warning(f"扫描失败: {file_path.name}")
-                continue
+                    if not music_data:
+                        stats['failed'] += 1
+                        logger.warning(f"扫描失败: {entry.name}")
+                        continue
             
-            # 检查是否已存在（根据MD5）
-            existing_by_md5 = db.query(Music).filter(
-                Music.md5 == music_data['md5'],
-                Music.device_id == 'server'  # 只检查服务端音乐
-            ).first()
-            if existing_by_md5:
-                # 更新可能缺失的信息（封面、歌词等）
-                updated = False
-                
-                # 更新封面（如果原记录没有封面，但现在找到了）
-                if existing_by_md5.cover_uuid is None and music_data.get('cover_uuid'):
-                    existing_by_md5.cover_uuid = music_data['cover_uuid']
-                    updated = True
-                    logger.info(f"更新封面UUID: {music_data['cover_uuid']}")
+                    # 同一文件夹内的重复文件或同名歌曲依赖已写入的记录判断，先写入待插入的批次
+                    # 歌名+作者与数据库判重一致，按 name_author_key 比较（忽略大小写/重音/末尾空格）
+                    name_key = name_author_key(music_data['name'], music_data['author'])
+                    if music_data['md5'] in pending_md5s or name_key in pending_keys:
+                        flush_pending()
+            
+                    # 检查是否已存在（根据MD5，只检查服务端音乐）
+                    existing_by_md5 = by_md5.get(music_data['md5'])
+                    if existing_by_md5:
+                        # 更新可能缺失的信息（封面、歌词等）
+                        changes = {}
                 
-                # 更新歌词（如果原记录没有歌词，但现在找到了）
-                current_lyric = getattr(existing_by_md5, 'lyric', None)
-                if (current_lyric is None or current_lyric == '') and music_data.get('lyric'):
-                    existing_by_md5.lyric = music_data['lyric']
-                    updated = True
-                    logger.info(f"更新歌词信息")
+                        # 更新封面（如果原记录没有封面，但现在找到了）
+                        if existing_by_md5.cover_uuid is None and music_data.get('cover_uuid'):
+                            changes['cover_uuid'] = music_data['cover_uuid']
+                            logger.info(f"更新封面UUID: {music_data['cover_uuid']}")
                 
-                # 更新专辑（如果原记录没有专辑，但现在找到了）
-                current_album = getattr(existing_by_md5, 'album', None)
-                if (current_album is None or current_album == '') and music_data.get('album'):
-                    existing_by_md5.album = music_data['album']
-                    updated = True
-                    logger.info(f"更新专辑: {music_data['album']}")
+                        # 更新歌词（如果原记录没有歌词，但现在找到了）
+                        current_lyric = getattr(existing_by_md5, 'lyric', None)
+                        if (current_lyric is None or current_lyric == '') and music_data.get('lyric'):
+                            changes['lyric'] = music_data['lyric']
+                            logger.info(f"更新歌词信息")
                 
-                # 更新比特率和时长（如果原记录为0）
-                current_bitrate = getattr(existing_by_md5, 'bitrate', 0)
-                if current_bitrate == 0 and music_data.get('bitrate', 0) > 0:
-                    existing_by_md5.bitrate = music_data['bitrate']
-                    updated = True
+                        # 更新专辑（如果原记录没有专辑，但现在找到了）
+                        current_album = getattr(existing_by_md5, 'album', None)
+                        if (current_album is None or current_album == '') and music_data.get('album'):
+                            changes['album'] = music_data['album']
+                            logger.info(f"更新专辑: {music_data['album']}")
                 
-                current_duration = getattr(existing_by_md5, 'duration', 0)
-                if current_duration == 0 and music_data.get('duration', 0) > 0:
-                    existing_by_md5.duration = music_data['duration']
-                    updated = True
+                        # 更新比特率和时长（如果原记录为0）
+                        current_bitrate = getattr(existing_by_md5, 'bitrate', 0)
+                        if current_bitrate == 0 and music_data.get('bitrate', 0) > 0:
+                            changes['bitrate'] = music_data['bitrate']
                 
-                if updated:
-                    try:
-                        db.commit()
-                        stats['upgraded'] += 1
-                        stats['files'].append(f"{existing_by_md5.name} (已更新)")
-                        logger.info(f"信息已更新: {existing_by_md5.name}")
-                        continue
-                    except Exception as e:
-                        db.rollback()
-                        logger.error(f"更新信息失败: {e}")
+                        current_duration = getattr(existing_by_md5, 'duration', 0)
+                        if current_duration == 0 and music_data.get('duration', 0) > 0:
+                            changes['duration'] = music_data['duration']
+                        
+                        updated = bool(changes)
+                        
+                        # 同一文件补记修改时间（旧数据或文件被 touch 过），下次扫描可直接跳过
+                        if (existing_by_md5.local_path == music_data['local_path']
+                                and existing_by_md5.mtime_ns != music_data['mtime_ns']):
+                            changes['mtime_ns'] = music_data['mtime_ns']
+                        
+                        # 修改留在会话中，随本批文件一起提交
+                        if changes:
+                            for key, value in changes.items():
+                                setattr(existing_by_md5, key, value)
+                            label = f"{existing_by_md5.name} (已更新)" if updated else None
+                            pending_updates.append((existing_by_md5.uuid, changes, label))
+                        
+                        if updated:
+                            logger.info(f"信息已更新: {existing_by_md5.name}")
+                            continue
                 
-                # 如果没有可更新的信息，则跳过
-                if skip_existing:
-                    stats['skipped'] += 1
-                    logger.info(f"文件MD5已存在且无需更新，跳过: {file_path.name}")
-                    continue
+                        # 如果没有可更新的信息，则跳过
+                        if skip_existing:
+                            stats['skipped'] += 1
+                            logger.info(f"文件MD5已存在且无需更新，跳过: {entry.name}")
+                            continue
             
-            # 检查是否有同名同作者的歌曲（可能是不同质量版本）
-            if upgrade_quality:
-                existing_by_name = db.query(Music).filter(
-                    Music.name == music_data['name'],
-                    Music.author == music_data['author']
-                ).first()
+                    # 检查是否有同名同作者的歌曲（可能是不同质量版本）
+                    if upgrade_quality:
+                        existing_by_name = by_name.get(name_key)
                 
-                if existing_by_name and not existing_by_md5:
-                    # 判断是否是更高质量的版本
-                    if is_better_quality(music_data, existing_by_name):
-                        logger.info(f"发现高质量版本，升级: {music_data['name']} (比特率: {existing_by_name.bitrate}kbps -> {music_data['bitrate']}kbps)")
+                        if existing_by_name and not existing_by_md5:
+                            # 判断是否是更高质量的版本
+                            if is_better_quality(music_data, existing_by_name):
+                                logger.info(f"发现高质量版本，升级: {music_data['name']} (比特率: {existing_by_name.bitrate}kbps -> {music_data['bitrate']}kbps)")
                         
-                        # 合并信息
-                        merged_data = merge_music_info(music_data, existing_by_name)
+                                # 合并信息
+                                merged_data = merge_music_info(music_data, existing_by_name)
                         
-                        # 更新数据库记录
-                        try:
-                            for key, value in merged_data.items():
-                                if key != 'uuid':  # uuid不更新
+                                # 更新数据库记录（uuid不更新），随本批文件一起提交
+                                changes = {key: value for key, value in merged_data.items() if key != 'uuid'}
+                                by_md5.pop(existing_by_name.md5, None)  # 升级后旧 MD5 不再对应此记录
+                                for key, value in changes.items():
                                     setattr(existing_by_name, key, value)
-                            db.commit()
-                            stats['upgraded'] += 1
-                            stats['files'].append(f"{music_data['name']} (已升级)")
-                            logger.info(f"升级成功: {music_data['name']}")
-                            continue
-                        except Exception as e:
-                            db.rollback()
-                            stats['failed'] += 1
-                            logger.error(f"升级失败 {file_path.name}: {e}")
-                            continue
-                    else:
-                        # 新版本质量不如旧版本，跳过
-                        stats['skipped'] += 1
-                        logger.info(f"已存在更高质量版本，跳过: {file_path.name}")
-                        continue
+                                by_md5[music_data['md5']] = existing_by_name
+                                pending_updates.append((existing_by_name.uuid, changes, f"{music_data['name']} (已升级)"))
+                                logger.info(f"升级: {music_data['name']}")
+                                continue
+                            else:
+                                # 新版本质量不如旧版本，跳过
+                                stats['skipped'] += 1
+                                logger.info(f"已存在更高质量版本，跳过: {entry.name}")
+                                continue
             
-            # 写入数据库
-            try:
-                music = add_music(db, music_data)
-                stats['success'] += 1
-                stats['files'].append(music.name)
-                logger.info(f"导入成功: {music.name} by {music.author}")
-            except Exception as e:
-                stats['failed'] += 1
-                logger.error(f"数据库写入失败 {file_path.name}: {e}")
+                    # 加入待写入批次
+                    pending.append(music_data)
+                    pending_md5s.add(music_data['md5'])
+                    pending_keys.add(name_key)
+                    if len(pending) >= IMPORT_BATCH_SIZE:
+                        flush_pending()
+                
+                # 每批文件结束时提交一次更新
+                flush_updates()
+        
+        flush_pending()
         
         logger.info(f"扫描完成! 总计:{stats['total']}, 成功:{stats['success']}, 升级:{stats['upgraded']}, 跳过:{stats['skipped']}, 失败:{stats['failed']}")
         
     except Exception as e:
         logger.error(f"扫描文件夹失败: {e}")
+    finally:
+        # 目录列表与封面去重只在本次扫描内有效，避免下次扫描读到旧结果
+        _dir_entries.cache_clear()
+        with _embedded_covers_lock:
+            _embedded_covers.clear()
     
     return stats
 
 # 使用示例
 if __name__ == "__main__":
     import sys
-    from app.database import SessionLocal
+    from app.database import SessionLocal, init_db
     
     # 检查命令行参数
     if len(sys.argv) < 2:
@@ -592,7 +874,8 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
     
-    # 创建数据库会话
+    # 创建数据库表（如不存在）和会话
+    init_db()
     db = SessionLocal()
     try:
         # 扫描并导入
@@ -2,20 +2,66 @@
 缩略图生成工具
 为封面图片生成小体积的缩略图
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 from PIL import Image
 import io
 
 from app.config import Config
 from app.log import logger
+from app.utils.cover_index import ensure_cover_dirs, register_thumbnail, resolve_cover_path
+
+# 可选：pyvips（libvips）按需分块处理，JPEG 可在解码时直接按 1/2~1/8 缩小，比 Pillow 快数倍
+# 未安装或缺少 libvips 动态库时使用 Pillow
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+
+def _thumbnail_vips(source: Union[Path, bytes], thumbnail_path: Path, size: tuple, quality: int):
+    """使用 libvips 生成缩略图（只缩小不放大，透明背景填充白色）"""
+    if isinstance(source, bytes):
+        img = pyvips.Image.thumbnail_buffer(source, size[0], height=size[1], size='down')
+    else:
+        img = pyvips.Image.thumbnail(str(source), size[0], height=size[1], size='down')
+    if img.hasalpha():
+        img = img.flatten(background=[255, 255, 255])
+    if img.interpretation != 'srgb':
+        img = img.colourspace('srgb')
+    img.jpegsave(str(thumbnail_path), Q=quality, strip=True, optimize_coding=True)
+
+
+def _thumbnail_pillow(source: Union[Path, bytes], thumbnail_path: Path, size: tuple, quality: int):
+    """使用 Pillow 生成缩略图"""
+    # 打开图片
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+        # 转换为RGB模式（某些PNG有透明通道）
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # 创建白色背景
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            if img.mode == 'P':
+                img = img.convert('RGBA')
+            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # 生成缩略图（保持宽高比）
+        img.thumbnail(size, Image.Resampling.LANCZOS)
+        
+        # 保存为JPEG格式（体积小）
+        img.save(thumbnail_path, 'JPEG', quality=quality, optimize=True)
 
 
 def generate_thumbnail(
     cover_path: Path,
     thumbnail_path: Path,
     size: Optional[tuple] = None,
-    quality: Optional[int] = None
+    quality: Optional[int] = None,
+    cover_data: Optional[bytes] = None
 ) -> bool:
     """
     生成缩略图
@@ -25,85 +71,74 @@ def generate_thumbnail(
         thumbnail_path: 缩略图保存路径
         size: 缩略图尺寸 (width, height)，默认使用Config配置
         quality: JPEG压缩质量 (1-100)，默认使用Config配置
+        cover_data: 封面图片内容（刚写入 cover_path 的数据），提供时直接解码，不再读取文件
         
     Returns:
         bool: 是否成功生成
     """
     try:
-        if not cover_path.exists():
-            logger.warning(f"封面文件不存在: {cover_path}")
-            return False
-        
         # 使用配置的默认值
         if size is None:
             size = Config.THUMBNAIL_SIZE
         if quality is None:
             quality = Config.THUMBNAIL_QUALITY
         
-        # 打开图片
-        with Image.open(cover_path) as img:
-            # 转换为RGB模式（某些PNG有透明通道）
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # 创建白色背景
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 生成缩略图（保持宽高比）
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            
-            # 确保目标目录存在
-            thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 保存为JPEG格式（体积小）
-            img.save(thumbnail_path, 'JPEG', quality=quality, optimize=True)
-            
+        source = cover_data if cover_data is not None else cover_path
+        
+        # 优先使用 libvips，libvips 不支持的格式（或出错）回退到 Pillow
+        if pyvips is not None:
+            try:
+                _thumbnail_vips(source, thumbnail_path, size, quality)
+            except pyvips.Error as e:
+                logger.debug("libvips 生成缩略图失败，改用 Pillow {}: {}", cover_path, e)
+                _thumbnail_pillow(source, thumbnail_path, size, quality)
+        else:
+            _thumbnail_pillow(source, thumbnail_path, size, quality)
+        
+        # 缩略图以 cover_uuid 命名 / Thumbnails are named after cover_uuid
+        register_thumbnail(thumbnail_path.stem, str(thumbnail_path))
         logger.info(f"生成缩略图成功: {thumbnail_path.name}")
         return True
         
+    except FileNotFoundError:
+        # 不预先 exists()，由 Image.open 直接报告文件缺失，省一次 stat（libvips 出错后同样回退到 Pillow 报告）
+        logger.warning(f"封面文件不存在: {cover_path}")
+        return False
     except Exception as e:
         logger.error(f"生成缩略图失败 {cover_path}: {e}")
         return False
 
 
-def generate_thumbnail_for_cover_uuid(cover_uuid: str) -> bool:
+def generate_thumbnail_for_cover_uuid(cover_uuid: str, cover_data: Optional[bytes] = None) -> bool:
     """
     根据cover_uuid生成缩略图
     
     Args:
         cover_uuid: 封面UUID
+        cover_data: 可选，封面图片内容（保存封面时已在内存中），提供时不再重新读取封面文件
         
     Returns:
         bool: 是否成功生成
     """
-    cover_dir = Path(Config.COVER_DIR)
     thumbnail_dir = Path(Config.THUMBNAIL_DIR)
+    ensure_cover_dirs()
     
-    # 查找原始封面文件
-    cover_path = None
-    for ext in Config.COVER_EXTS:
-        test_path = cover_dir / f"{cover_uuid}{ext}"
-        if test_path.exists():
-            cover_path = test_path
-            break
-    
-    if not cover_path:
+    # 从封面索引查找原始封面文件
+    resolved = resolve_cover_path(cover_uuid)
+    if not resolved:
         logger.warning(f"未找到封面文件: {cover_uuid}")
         return False
+    cover_path = Path(resolved[0])
     
     # 缩略图统一使用.jpg扩展名
     thumbnail_path = thumbnail_dir / f"{cover_uuid}.jpg"
     
     # 如果缩略图已存在，跳过
     if thumbnail_path.exists():
-        logger.debug(f"缩略图已存在: {thumbnail_path.name}")
+        logger.debug("缩略图已存在: {}", thumbnail_path.name)
         return True
     
-    return generate_thumbnail(cover_path, thumbnail_path)
+    return generate_thumbnail(cover_path, thumbnail_path, cover_data=cover_data)
 
 
 def batch_generate_thumbnails(cover_dir: Optional[Path] = None) -> dict:
@@ -120,7 +155,7 @@ def batch_generate_thumbnails(cover_dir: Optional[Path] = None) -> dict:
         cover_dir = Path(Config.COVER_DIR)
     
     thumbnail_dir = Path(Config.THUMBNAIL_DIR)
-    thumbnail_dir.mkdir(parents=True, exist_ok=True)
+    ensure_cover_dirs()
     
     stats = {
         'total': 0,
@@ -129,31 +164,48 @@ def batch_generate_thumbnails(cover_dir: Optional[Path] = None) -> dict:
         'failed': 0
     }
     
+    # 一次 scandir 取得已生成的缩略图集合，避免对每个封面单独 stat
+    with os.scandir(thumbnail_dir) as it:
+        done = {
+            entry.name[:-4]
+            for entry in it
+            if entry.name.endswith('.jpg')
+        }
+    
     # 遍历所有封面文件
-    for cover_path in cover_dir.iterdir():
-        if not cover_path.is_file():
-            continue
+    with os.scandir(cover_dir) as it:
+        cover_entries = [entry for entry in it if entry.is_file()]
+    
+    # 需要生成的 (封面, 缩略图) 列表
+    pairs = []
+    for entry in cover_entries:
+        stem, ext = os.path.splitext(entry.name)
         
         # 检查是否为支持的图片格式
-        if cover_path.suffix.lower() not in Config.COVER_EXTS:
+        if ext.lower() not in Config.COVER_EXT_SET:
             continue
         
         stats['total'] += 1
         
-        # 缩略图路径（统一使用.jpg）
-        thumbnail_path = thumbnail_dir / f"{cover_path.stem}.jpg"
-        
         # 如果缩略图已存在，跳过
-        if thumbnail_path.exists():
+        if stem in done:
             stats['skipped'] += 1
-            logger.debug(f"缩略图已存在，跳过: {thumbnail_path.name}")
+            logger.debug("缩略图已存在，跳过: {}.jpg", stem)
             continue
         
-        # 生成缩略图
-        if generate_thumbnail(cover_path, thumbnail_path):
-            stats['success'] += 1
-        else:
-            stats['failed'] += 1
+        # 缩略图统一使用.jpg
+        pairs.append((Path(entry.path), thumbnail_dir / f"{stem}.jpg"))
+    
+    # 多线程生成缩略图（Pillow 解码、缩放、编码时会释放 GIL）
+    # 使用线程而非进程：生成后需在本进程登记缩略图索引
+    if pairs:
+        with ThreadPoolExecutor(max_workers=Config.SCAN_WORKERS) as executor:
+            results = executor.map(lambda pair: generate_thumbnail(*pair), pairs)
+            for ok in results:
+                if ok:
+                    stats['success'] += 1
+                else:
+                    stats['failed'] += 1
     
     logger.info(
         f"批量生成缩略图完成: "
@@ -0,0 +1,31 @@
+"""
+按时间排序的 UUID（UUIDv7，RFC 9562）
+前 48 位为毫秒时间戳，新记录的主键按插入顺序递增，追加在 B-tree 索引右侧，减少页分裂
+Python 3.14 之前标准库没有 uuid7，这里按规范自行生成
+"""
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """
+    生成 UUIDv7
+
+    布局: 48 位 Unix 毫秒时间戳 | 4 位版本(7) | 12 位随机 | 2 位变体(10) | 62 位随机
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    rand_a = rand >> 68  # 12 位
+    rand_b = rand & ((1 << 62) - 1)  # 62 位
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | rand_a << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+__all__ = ["uuid7"]
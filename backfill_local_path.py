@@ -0,0 +1,41 @@
+"""
+回填服务端音乐本地路径工具
+为缺少 local_path 的服务端音乐在 MUSIC_DIR 中匹配文件并写回数据库
+播放接口只读取 local_path，旧数据需运行一次此脚本
+"""
+from app.database import SessionLocal
+from app.services.music_service import backfill_local_paths
+from app.log import logger
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🎵  回填服务端音乐本地路径")
+    print("=" * 60)
+    print()
+    
+    db = SessionLocal()
+    try:
+        logger.info("开始回填 local_path...")
+        stats = backfill_local_paths(db)
+        
+        print()
+        print("=" * 60)
+        print("📊 回填结果统计")
+        print("=" * 60)
+        print(f"  📂 待回填音乐: {stats['total']}")
+        print(f"  ✅ 回填成功: {stats['filled']}")
+        print(f"  ❌ 未找到文件: {stats['missing']}")
+        print("=" * 60)
+        print()
+        
+        if stats['total'] == 0:
+            print("ℹ️  所有服务端音乐都已有 local_path，无需回填")
+        elif stats['missing'] > 0:
+            print(f"⚠️  {stats['missing']} 首音乐未在 MUSIC_DIR 中找到文件")
+        
+    except Exception as e:
+        print(f"\n❌ 发生错误: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        db.close()
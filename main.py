@@ -1,16 +1,45 @@
+from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import music, device, recommend
-from app.database import engine, Base
+from app.database import init_db
 from app.log import logger
 from app.core.scheduler import get_scheduler
+from app.core.play_counter import get_play_counter
+from app.utils.cover_index import load_cover_index
 from app.config import Config
 from app.middleware.auth import TokenAuthMiddleware
+from app.middleware.gzip import SelectiveGZipMiddleware
+from app.responses import ORJSONResponse
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Music Server", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 访问数据库的路由是同步 def，在 anyio 线程池中执行；
+    # 线程数与连接上限对齐，避免线程数成为并发瓶颈或多出的线程空等连接
+    anyio.to_thread.current_default_thread_limiter().total_tokens = Config.THREADPOOL_SIZE
+    logger.info(f"线程池大小 / Threadpool size: {Config.THREADPOOL_SIZE}")
+    # 创建数据库表（仅启动时执行一次）
+    init_db()
+    # 启动调度器（建表之后，首次同步即可读取任务表）
+    get_scheduler()
+    logger.info("定时任务调度器已启动 / Scheduler started")
+    # 建立封面/缩略图路径索引
+    load_cover_index()
+    # 启动播放次数写回线程
+    play_counter = get_play_counter()
+    yield
+    # 关闭时写回剩余播放次数
+    play_counter.stop()
+
+
+app = FastAPI(
+    title="Music Server",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson 序列化所有 JSON 响应
+)
 
 # 添加 CORS 中间件（允许跨域）
 app.add_middleware(
@@ -26,16 +55,24 @@ logger.info(f"CORS 中间件已启用 / CORS middleware enabled (origins: {Confi
 app.add_middleware(TokenAuthMiddleware)
 logger.info("Token 认证中间件已启用 / Token authentication middleware enabled")
 
+# 添加 GZip 压缩中间件（最后添加即最外层，401 响应同样可压缩）
+# 仅压缩 ≥1KB 的响应；播放/封面/缩略图路由及带 Range 的请求不经过压缩
+# （锁定的 Starlette 版本不会自动排除 audio/image 和 206 响应）
+# 压缩级别 5：重复度高的 JSON 压缩率与默认的 9 级相差无几，CPU 开销明显更低
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    skip_prefixes=("/music/play/", "/music/cover/", "/music/thumbnail/"),
+    minimum_size=1024,
+    compresslevel=5,
+)
+logger.info("GZip 压缩中间件已启用 / GZip middleware enabled")
+
 # 注册路由
 app.include_router(music.router, tags=["music"])
 app.include_router(device.router, tags=["device"])
 app.include_router(recommend.router, tags=["recommend"])
 logger.info("路由已注册 / Routers registered")
 
-# 启动调度器
-scheduler = get_scheduler()
-logger.info("定时任务调度器已启动 / Scheduler started")
-
 @app.get("/")
 async def root():
     return {"message": "Music Server API", "version": "1.0.0"}
@@ -47,5 +84,6 @@ if __name__ == "__main__":
         "main:app",  # 使用字符串格式，而不是直接传入 app 对象
         host=Config.SERVER_HOST, 
         port=Config.SERVER_PORT, 
-        reload=Config.RELOAD  # 通过配置控制是否启用热重载
+        reload=Config.RELOAD,  # 通过配置控制是否启用热重载
+        loop="auto"  # 已安装 uvloop 时（非 Windows）自动使用，否则回退到 asyncio
     )
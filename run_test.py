@@ -2,29 +2,39 @@
 测试运行脚本 / Test Runner Script
 
 用于从项目根目录运行测试文件
+通过 pytest 在子进程中运行；已安装 pytest-xdist 时按文件分配到多个进程并行执行
 """
 
 import sys
 import os
+import subprocess
+from importlib.util import find_spec
 
-# 添加项目根目录到 Python 路径
+# 项目根目录（pytest 在此目录下运行）
 project_root = os.path.dirname(os.path.abspath(__file__))
-sys.path.insert(0, project_root)
 
 if __name__ == "__main__":
     import argparse
-    
+
     parser = argparse.ArgumentParser(description="运行测试")
-    parser.add_argument("test_file", help="测试文件名 (例如: test_scheduler 或 test_message_queue)")
+    parser.add_argument(
+        "test_files", nargs="*",
+        help="测试文件名 (例如: test_scheduler 或 test_message_queue)，不传则运行 test/ 下全部测试"
+    )
     args = parser.parse_args()
-    
-    # 导入并运行测试
-    test_module = f"test.{args.test_file}"
-    print(f"运行测试: {test_module}")
+
+    # 测试文件名映射为 pytest 路径
+    targets = [
+        os.path.join("test", name if name.endswith(".py") else f"{name}.py")
+        for name in args.test_files
+    ] or ["test"]
+
+    command = [sys.executable, "-m", "pytest", *targets]
+    # pytest-xdist 为可选依赖：同一文件内的测试共享模块级状态，按文件分配到同一进程
+    if find_spec("xdist") is not None:
+        command += ["-n", "auto", "--dist", "loadfile"]
+
+    print(f"运行测试: {' '.join(targets)}")
     print("=" * 60)
-    
-    try:
-        __import__(test_module)
-    except Exception as e:
-        print(f"测试失败: {e}")
-        sys.exit(1)
+
+    sys.exit(subprocess.call(command, cwd=project_root))
@@ -0,0 +1,74 @@
+"""
+GZip 压缩范围测试 / GZip Scope Test
+
+JSON 响应压缩；播放/封面/缩略图路由及带 Range 的请求不压缩（与 main.py 中的注册参数一致）
+JSON is compressed; file routes and Range requests are passed through uncompressed
+"""
+
+import sys
+import os
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from app.middleware.gzip import SelectiveGZipMiddleware
+from app.log import logger
+
+app = FastAPI()
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    skip_prefixes=("/music/play/", "/music/cover/", "/music/thumbnail/"),
+    minimum_size=1024,
+    compresslevel=5,
+)
+
+_BODY = b"x" * 4096
+
+
+@app.get("/music/list")
+def list_music():
+    return {"list": ["song"] * 500}
+
+
+@app.get("/music/play/{uuid}")
+def play_music(uuid: str):
+    return Response(_BODY, media_type="audio/mpeg")
+
+
+@app.get("/music/cover/{cover_uuid}")
+def get_cover(cover_uuid: str):
+    return Response(_BODY, media_type="image/png")
+
+
+client = TestClient(app)
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_json_compressed():
+    """JSON 响应压缩 / JSON responses are compressed"""
+    response = client.get("/music/list", headers=GZIP)
+    assert response.headers.get("content-encoding") == "gzip"
+    assert len(response.json()["list"]) == 500
+
+
+def test_file_routes_not_compressed():
+    """文件路由不压缩，保留 Content-Length / File routes keep Content-Length"""
+    for url in ("/music/play/abc", "/music/cover/abc"):
+        response = client.get(url, headers=GZIP)
+        assert "content-encoding" not in response.headers, url
+        assert response.headers["content-length"] == str(len(_BODY))
+
+
+def test_range_request_not_compressed():
+    """带 Range 的请求不压缩 / Range requests are not compressed"""
+    response = client.get("/music/list", headers={**GZIP, "Range": "bytes=0-99"})
+    assert "content-encoding" not in response.headers
+
+
+if __name__ == "__main__":
+    test_json_compressed()
+    test_file_routes_not_compressed()
+    test_range_request_not_compressed()
+    logger.success("\n所有测试完成 / All tests completed")
@@ -9,10 +9,21 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import threading
 import time
-from app.core.message_queue import get_queue, push_task, pop_task, set_public, get_public
+from app.core.message_queue import get_queue, push_task, pop_task, set_public, get_public, MemoryQueue, NormalTask
 from app.log import logger
 
 
+# 每处理完一个任务释放一次，测试据此等待任务完成，代替固定时长的 sleep
+# Released once per processed task; tests wait on it instead of sleeping a fixed time
+_processed = threading.Semaphore(0)
+
+
+def wait_processed(count: int, timeout: float = 10):
+    """等待 count 个任务处理完成 / Wait until count tasks have been processed"""
+    for _ in range(count):
+        assert _processed.acquire(timeout=timeout), "任务未在超时内完成 / Task not processed in time"
+
+
 def worker(worker_id: int, queue):
     """
     工作线程 / Worker thread
@@ -39,13 +50,13 @@ def worker(worker_id: int, queue):
                 url = params.get("url")
                 save_path = params.get("save_path")
                 logger.info(f"  下载音频 / Downloading: {url} -> {save_path}")
-                time.sleep(2)  # 模拟下载时间
+                time.sleep(0.2)  # 模拟下载时间
                 
             elif task_type == "convert_format":
                 input_file = params.get("input_file")
                 output_format = params.get("output_format")
                 logger.info(f"  转换格式 / Converting: {input_file} -> {output_format}")
-                time.sleep(1)  # 模拟转换时间
+                time.sleep(0.1)  # 模拟转换时间
                 
             else:
                 logger.warning(f"  未知任务类型 / Unknown task type: {task_type}")
@@ -53,6 +64,7 @@ def worker(worker_id: int, queue):
             # 标记任务完成
             queue.task_done()
             logger.success(f"Worker-{worker_id} 任务完成 / Task completed: {task_id}")
+            _processed.release()
             
         except Exception as e:
             logger.error(f"Worker-{worker_id} 任务失败 / Task failed: {e}")
@@ -92,7 +104,7 @@ def test_basic_queue():
     thread.start()
     
     # 等待任务完成
-    time.sleep(5)
+    wait_processed(2)
 
 
 def test_public_store():
@@ -105,8 +117,8 @@ def test_public_store():
     set_public("api_key", "abc123xyz")
     logger.info(f"API Key: {get_public('api_key')}")
     
-    # 设置临时数据(5秒后过期)
-    set_public("session_cookie", "cookie_value_123", ttl=5)
+    # 设置临时数据(1秒后过期)
+    set_public("session_cookie", "cookie_value_123", ttl=1)
     logger.info(f"Session Cookie: {get_public('session_cookie')}")
     
     # 设置任务状态
@@ -121,12 +133,14 @@ def test_public_store():
     logger.info(f"所有键 / All keys: {queue.list_keys()}")
     
     # 等待过期
-    logger.info("等待5秒测试TTL / Waiting 5s for TTL test...")
-    time.sleep(6)
+    logger.info("等待1秒测试TTL / Waiting 1s for TTL test...")
+    time.sleep(1.5)
     
     # 检查过期数据
     logger.info(f"Session Cookie (应该过期): {get_public('session_cookie')}")
     logger.info(f"API Key (不应过期): {get_public('api_key')}")
+    assert get_public("session_cookie") is None
+    assert get_public("api_key") == "abc123xyz"
     
     # 清理
     queue.clear_store()
@@ -162,7 +176,29 @@ def test_multi_workers():
     logger.info(f"当前队列大小 / Current queue size: {queue.get_queue_size()}")
     
     # 等待所有任务完成
-    time.sleep(10)
+    wait_processed(10)
+
+
+def test_scheduled_task_retry():
+    """定时任务触发的 NormalTask 支持文档中的重试写法 / Fired NormalTask survives the documented retry pattern"""
+    logger.info("\n===== 测试: 定时任务重试 / Test: Scheduled Task Retry =====")
+    
+    # 独立队列，避免前面测试启动的 Worker 取走任务 / Separate queue so earlier workers don't take the task
+    queue = MemoryQueue()
+    queue.push_task(NormalTask(task_id="", type="download_audio", params={"url": "x"}, scheduler_task_id="s1"))
+    
+    task = queue.pop_task(timeout=1)
+    assert isinstance(task, dict)
+    assert task["scheduler_task_id"] == "s1"
+    
+    # 与 docs/message_queue_usage.md 中 worker_with_retry 相同的写法
+    retry_count = task.get("retry_count", 0)
+    task["retry_count"] = retry_count + 1
+    queue.push_task(task)
+    
+    retried = queue.pop_task(timeout=1)
+    assert retried["retry_count"] == 1
+    assert retried["task_id"] == task["task_id"]
 
 
 def test_bilibili_download():
@@ -212,6 +248,7 @@ if __name__ == "__main__":
         test_basic_queue()
         test_public_store()
         test_multi_workers()
+        test_scheduled_task_retry()
         test_bilibili_download()
         
         logger.success("\n所有测试完成 / All tests completed")
@@ -0,0 +1,231 @@
+"""
+音乐接口 SQL 语句数测试 / Music API Statement Count Test
+
+列表/搜索/推荐接口每次请求的 SQL 语句数应为常数，不随返回行数增长（防止 N+1）
+List/search/recommend endpoints must issue a constant number of statements per request
+"""
+
+import sys
+import os
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+# 使用内存 SQLite 代替 MySQL（表在下方 create_all 时创建，导入模块不会建表）
+# 路由依赖 get_db、播放次数写回等模块按名称导入了 SessionLocal，因此原地重新绑定其会话工厂而不是替换对象；
+# 在导入路由之前完成，之后任何模块创建的会话都连接 SQLite；同时替换 database.engine，init_db 也作用于 SQLite
+import app.database as database
+engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+database.engine = engine
+database.SessionLocal.session_factory.configure(bind=engine)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.models.music import Music
+from app.routers import music, recommend
+from app.log import logger
+
+database.Base.metadata.create_all(bind=engine)
+
+app = FastAPI()
+app.include_router(music.router)
+app.include_router(recommend.router)
+client = TestClient(app)
+
+# 每个请求允许的最大语句数 / Max statements allowed per request
+MAX_STATEMENTS = 2
+
+
+@contextmanager
+def count_statements():
+    """统计代码块内执行的 SQL 语句数 / Count SQL statements executed in the block"""
+    counter = {"count": 0}
+
+    def before_cursor_execute(*args):
+        counter["count"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def setup_module(module=None):
+    """写入测试数据 / Insert test data"""
+    db = database.SessionLocal()
+    try:
+        db.query(Music).delete()
+        db.add_all([
+            Music(
+                uuid=f"music-{i:03d}",
+                md5=f"md5-{i:03d}",
+                device_id="server",
+                name=f"song {i}",
+                author=f"author {i % 7}",
+                lyric=f"lyric line {i}",
+                cover_uuid=f"cover-{i % 5}",
+                play_count=i,
+            )
+            for i in range(150)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def assert_statements(url: str):
+    """请求接口并断言语句数 / Request the endpoint and check the statement count"""
+    with count_statements() as counter:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    assert counter["count"] <= MAX_STATEMENTS, f"{url}: {counter['count']} statements"
+    logger.info(f"{url}: {counter['count']} statements")
+    return response.json()["data"]
+
+
+def test_list_statements():
+    """列表接口 / List endpoint"""
+    data = assert_statements("/music/list?page_size=100")
+    assert len(data["list"]) == 100
+    assert_statements(f"/music/list?page_size=100&cursor={data['next_cursor']}")
+
+
+def test_search_statements():
+    """搜索接口 / Search endpoints"""
+    data = assert_statements("/music/search?keyword=song&page_size=100")
+    assert len(data["list"]) == 100
+    assert data["next_cursor"] is not None
+    assert_statements(f"/music/search?keyword=song&page_size=100&cursor={data['next_cursor']}")
+    assert_statements("/music/search/lyric?keyword=lyric&page_size=100")
+
+
+def test_count_cache_and_skip_count():
+    """总数缓存与不计算总数 / Cached totals and skip_count"""
+    first = assert_statements("/music/search?keyword=song&page_size=20")
+    second = assert_statements("/music/search?keyword=song&page=2&page_size=20")
+    assert first["total"] == second["total"] == 150
+    data = assert_statements("/music/list?page_size=20&skip_count=true")
+    assert data["total"] is None
+    assert len(data["list"]) == 20
+    assert data["next_cursor"] is not None
+
+
+def test_list_cache():
+    """列表页缓存 / Cached list pages"""
+    first = assert_statements("/music/list?page_size=30")
+    with count_statements() as counter:
+        second = client.get("/music/list?page_size=30").json()["data"]
+    assert counter["count"] == 0
+    assert second == first
+
+
+def test_list_etag():
+    """列表接口条件请求 / Conditional GET on the list endpoint"""
+    response = client.get("/music/list?page_size=10")
+    etag = response.headers["etag"]
+    not_modified = client.get("/music/list?page_size=10", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    other = client.get("/music/list?page_size=11", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_name_author_key_variants():
+    """(歌名, 作者) 判重键忽略大小写/末尾空格/重音 / Name-author key folds case, trailing spaces and accents"""
+    from app.services.music_service import get_musics_by_name_author, name_author_key
+    db = database.SessionLocal()
+    try:
+        db.add(Music(uuid="variant-1", md5="md5-variant", device_id="server",
+                     name="Café Song ", author="ARTIST"))
+        db.commit()
+        # MySQL 的 _ci 排序规则会为变体返回该记录；SQLite 区分大小写，这里用存储值查询
+        found = get_musics_by_name_author(db, [("Café Song ", "ARTIST")])
+        assert found[name_author_key("cafe song", "artist")].uuid == "variant-1"
+        assert name_author_key("Song", "Artist") != name_author_key("Song 2", "Artist")
+    finally:
+        db.query(Music).filter(Music.uuid == "variant-1").delete()
+        db.commit()
+        db.close()
+
+
+def test_row_cache_skips_store_after_invalidation():
+    """查询期间发生失效时不写入缓存 / A row read across an invalidation is not cached"""
+    from app.services.music_service import get_music_row, invalidate_music_cache
+
+    class InvalidatingSession:
+        """执行查询时模拟并发写入后的失效 / Simulate a concurrent write's invalidation mid-query"""
+        def __init__(self, db):
+            self.db = db
+
+        def execute(self, *args, **kwargs):
+            invalidate_music_cache("music-001")
+            return self.db.execute(*args, **kwargs)
+
+    db = database.SessionLocal()
+    try:
+        invalidate_music_cache("music-001")
+        assert get_music_row(InvalidatingSession(db), "music-001")["uuid"] == "music-001"
+        with count_statements() as counter:
+            get_music_row(db, "music-001")
+        assert counter["count"] == 1
+    finally:
+        db.close()
+
+
+def test_empty_invalidation_keeps_row_cache():
+    """空 uuid 列表不清空缓存 / Invalidating no uuids leaves the row cache intact"""
+    from app.services.music_service import get_music_row, invalidate_music_cache, clear_music_cache
+    db = database.SessionLocal()
+    try:
+        get_music_row(db, "music-002")
+        invalidate_music_cache(*[])
+        with count_statements() as counter:
+            get_music_row(db, "music-002")
+        assert counter["count"] == 0
+        clear_music_cache()
+        with count_statements() as counter:
+            get_music_row(db, "music-002")
+        assert counter["count"] == 1
+    finally:
+        db.close()
+
+
+def test_parse_range():
+    """Range 头解析 / Range header parsing"""
+    from fastapi import HTTPException
+    from app.routers.music import _parse_range
+    assert _parse_range("bytes=0-99", 1000) == (0, 99)
+    assert _parse_range("bytes=900-", 1000) == (900, 999)
+    assert _parse_range("bytes=-100", 1000) == (900, 999)
+    # 起点大于终点：语法无效，忽略 Range / Reversed range is ignored (full 200)
+    assert _parse_range("bytes=500-100", 1000) is None
+    try:
+        _parse_range("bytes=1000-1100", 1000)
+        assert False, "expected 416"
+    except HTTPException as e:
+        assert e.status_code == 416
+
+
+def test_recommend_statements():
+    """推荐接口 / Recommend endpoints"""
+    assert_statements("/recommend/mymusic/hot?pick=50")
+    assert_statements("/recommend/mymusic/cold?pick=50")
+
+
+if __name__ == "__main__":
+    setup_module()
+    test_list_statements()
+    test_search_statements()
+    test_count_cache_and_skip_count()
+    test_list_cache()
+    test_list_etag()
+    test_name_author_key_variants()
+    test_row_cache_skips_store_after_invalidation()
+    test_empty_invalidation_keeps_row_cache()
+    test_parse_range()
+    test_recommend_statements()
+    logger.success("\n所有测试完成 / All tests completed")